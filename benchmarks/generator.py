@@ -0,0 +1,211 @@
+import os
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List
+
+from openpyxl import Workbook
+
+WEEK_DAYS = ["понедельник", "вторник", "среда", "четверг", "пятница", "суббота"]
+MONTHS = [
+    "января",
+    "февраля",
+    "марта",
+    "апреля",
+    "мая",
+    "июня",
+    "июля",
+    "августа",
+    "сентября",
+    "октября",
+    "ноября",
+    "декабря",
+]
+SUBGROUP_SUFFIXES = "абвгде"
+
+HEADER_ROW = 3
+START_COLUMN = 4
+
+
+@dataclass
+class WorkbookSpec:
+    groups: int = 8
+    subgroups: int = 2
+    weeks: int = 2
+    pairs_per_day: int = 4
+    merge_density: float = 0.3
+    fill_rate: float = 0.8
+    exam: bool = False
+    start_date: date = date(2025, 9, 1)
+    group_offset: int = 0
+    seed: int = 0
+
+
+def _study_days(spec: WorkbookSpec) -> List[date]:
+    days = []
+    day = spec.start_date
+    while len(days) < spec.weeks * len(WEEK_DAYS):
+        if day.weekday() < len(WEEK_DAYS):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _write_header(worksheet, spec: WorkbookSpec) -> List[range]:
+    worksheet.cell(
+        1,
+        1,
+        "Расписание экзаменов и зачетов" if spec.exam else "Расписание учебных занятий",
+    )
+    column_ranges = []
+    column = START_COLUMN
+    for group_idx in range(spec.groups):
+        columns = range(column, column + spec.subgroups)
+        group_name = f"{101 + spec.group_offset + group_idx}"
+        header = [
+            f"{1 + group_idx % 4} курс",
+            f"Специальность {group_idx % 5}",
+            group_name,
+        ]
+        for offset, value in enumerate(header):
+            worksheet.cell(HEADER_ROW + offset, columns.start, value)
+            if spec.subgroups > 1:
+                worksheet.merge_cells(
+                    start_row=HEADER_ROW + offset,
+                    start_column=columns.start,
+                    end_row=HEADER_ROW + offset,
+                    end_column=columns.stop - 1,
+                )
+        for idx, subgroup_column in enumerate(columns):
+            worksheet.cell(
+                HEADER_ROW + 3,
+                subgroup_column,
+                f"{group_name}{SUBGROUP_SUFFIXES[idx]}",
+            )
+        column_ranges.append(columns)
+        column = columns.stop
+    worksheet.cell(HEADER_ROW + 4, 1, "День")
+    return column_ranges
+
+
+def _lesson_columns(rnd: random.Random, spec: WorkbookSpec, columns: range):
+    if spec.subgroups > 1 and rnd.random() < spec.merge_density:
+        yield columns.start, columns.stop - 1
+        return
+    for column in columns:
+        yield column, column
+
+
+def _write_pairs(
+    worksheet, rnd: random.Random, spec: WorkbookSpec, column_ranges: List[range]
+) -> None:
+    row = HEADER_ROW + 5
+    for day in _study_days(spec):
+        first_row = row
+        worksheet.cell(row, START_COLUMN - 3, WEEK_DAYS[day.weekday()])
+        worksheet.cell(
+            row,
+            START_COLUMN - 2,
+            f"{day.day} {MONTHS[day.month - 1]} {day.year} г.",
+        )
+        for number in range(1, spec.pairs_per_day + 1):
+            worksheet.cell(row, START_COLUMN - 1, str(number))
+            for columns in column_ranges:
+                for first, last in _lesson_columns(rnd, spec, columns):
+                    if rnd.random() < spec.fill_rate:
+                        lesson = [
+                            f"Дисциплина {rnd.randint(1, 40)}",
+                            f"Преподаватель {rnd.randint(1, 60)}",
+                            f"ауд. {rnd.randint(100, 140)}",
+                        ]
+                        for offset, value in enumerate(lesson):
+                            worksheet.cell(row + offset, first, value)
+                    if first != last:
+                        for offset in range(3):
+                            worksheet.merge_cells(
+                                start_row=row + offset,
+                                start_column=first,
+                                end_row=row + offset,
+                                end_column=last,
+                            )
+            row += 3
+        for column in (START_COLUMN - 3, START_COLUMN - 2):
+            worksheet.merge_cells(
+                start_row=first_row,
+                start_column=column,
+                end_row=row - 1,
+                end_column=column,
+            )
+        row += 1
+
+
+def _write_exams_credits(
+    worksheet, rnd: random.Random, spec: WorkbookSpec, column_ranges: List[range]
+) -> None:
+    row = HEADER_ROW + 5
+    for day in _study_days(spec):
+        worksheet.cell(
+            row,
+            START_COLUMN - 1,
+            f"{day.strftime('%d.%m.%Y')} {WEEK_DAYS[day.weekday()]}",
+        )
+        for columns in column_ranges:
+            for first, last in _lesson_columns(rnd, spec, columns):
+                if rnd.random() < spec.fill_rate:
+                    worksheet.cell(
+                        row,
+                        first,
+                        f"Дисциплина {rnd.randint(1, 40)}\n"
+                        f"Преподаватель {rnd.randint(1, 60)}\n"
+                        f"ауд. {rnd.randint(100, 140)}, "
+                        f"{rnd.choice(['9.00', '11.00', '13.00'])}",
+                    )
+                if first != last:
+                    worksheet.merge_cells(
+                        start_row=row, start_column=first, end_row=row, end_column=last
+                    )
+        row += 1
+
+
+def generate_workbook(file_path: str | Path, spec: WorkbookSpec) -> None:
+    rnd = random.Random(spec.seed)
+    workbook = Workbook()
+    worksheet = workbook.active
+    column_ranges = _write_header(worksheet, spec)
+    if spec.exam:
+        _write_exams_credits(worksheet, rnd, spec, column_ranges)
+    else:
+        _write_pairs(worksheet, rnd, spec, column_ranges)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    workbook.save(file_path)
+
+
+def generate_dataset(
+    data_folder: str | Path,
+    files: int,
+    spec: WorkbookSpec,
+    exam_share: float = 0.2,
+    faculties: int = 4,
+) -> List[Path]:
+    paths = []
+    exam_files = round(files * exam_share)
+    for idx in range(files):
+        file_spec = WorkbookSpec(
+            **{
+                **vars(spec),
+                "seed": spec.seed + idx,
+                "group_offset": spec.group_offset + idx * spec.groups,
+                "exam": idx < exam_files,
+            }
+        )
+        form = "зо" if idx % 4 == 3 else "до"
+        file_path = (
+            Path(data_folder)
+            / f"Факультет {idx % faculties + 1}"
+            / form
+            / f"Расписание {idx + 1}.xlsx"
+        )
+        generate_workbook(file_path, file_spec)
+        paths.append(file_path)
+    return paths
@@ -0,0 +1,226 @@
+import os
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import database
+import parse_xlsx
+import upload
+from benchmarks.generator import WorkbookSpec, generate_dataset
+from benchmarks.sqlite_shim import SQLiteConnection
+from settings import PARSE_CACHE_FOLDER, PARSE_WORKERS
+
+
+def _best_time(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return round(min(timings), 4)
+
+
+def _clear_parse_cache() -> None:
+    shutil.rmtree(PARSE_CACHE_FOLDER, ignore_errors=True)
+
+
+def _parse_cold(workers: int):
+    _clear_parse_cache()
+    return parse_xlsx.get_parsed_data(workers=workers)
+
+
+def bench_parse(repeat: int, workers: int) -> Dict[str, Any]:
+    results = {
+        "serial_seconds": _best_time(lambda: _parse_cold(1), repeat),
+        "workers": workers,
+        "parallel_seconds": _best_time(lambda: _parse_cold(workers), repeat),
+    }
+    parse_xlsx.get_parsed_data(workers=1)
+    results["cached_seconds"] = _best_time(
+        lambda: parse_xlsx.get_parsed_data(workers=1), repeat
+    )
+    return results
+
+
+def bench_stages(paths: List[Path], repeat: int) -> Dict[str, float]:
+    file_paths = [str(path) for path in paths]
+    grids = [parse_xlsx._load_grid_openpyxl(path) for path in file_paths]
+    sheets = []
+    for grid in grids:
+        groups, pair_type, layout = parse_xlsx._get_groups(grid, "Факультет", "до")
+        sheets.append((grid, groups, pair_type, layout))
+
+    def extract_records():
+        for grid, groups, pair_type, layout in sheets:
+            if pair_type == "обыч":
+                parse_xlsx._get_pairs(grid, layout, groups)
+            else:
+                parse_xlsx._get_exam_credit(grid, layout, groups)
+
+    return {
+        "load_grid_openpyxl_seconds": _best_time(
+            lambda: [parse_xlsx._load_grid_openpyxl(path) for path in file_paths],
+            repeat,
+        ),
+        "load_grid_fast_seconds": _best_time(
+            lambda: [parse_xlsx._load_grid_fast(path) for path in file_paths],
+            repeat,
+        ),
+        "build_merged_index_seconds": _best_time(
+            lambda: [
+                parse_xlsx.build_merged_index(grid.merged_ranges) for grid in grids
+            ],
+            repeat,
+        ),
+        "get_groups_seconds": _best_time(
+            lambda: [parse_xlsx._get_groups(grid, "Факультет", "до") for grid in grids],
+            repeat,
+        ),
+        "get_pairs_and_exams_credits_seconds": _best_time(extract_records, repeat),
+    }
+
+
+def bench_memory() -> Dict[str, int]:
+    _clear_parse_cache()
+    tracemalloc.start()
+    try:
+        parsed_data = parse_xlsx.get_parsed_data(workers=1)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del parsed_data
+    return {"peak_bytes": peak, "retained_bytes": retained}
+
+
+def _count_rows(table: str) -> int:
+    with database.get_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS count FROM {table};")
+        return cursor.fetchone()["count"]
+
+
+def _throughput(func: Callable[[], Any], rows: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+    }
+
+
+def bench_upload(workspace: Path) -> Dict[str, Any]:
+    database_path = str(workspace / "benchmark.sqlite3")
+    database.init_pool(lambda: SQLiteConnection(database_path), 1)
+    groups, pairs, exams_credits = parse_xlsx.get_parsed_data(workers=1)
+    subgroups = sum(len(group.subgroups) for group in groups)
+
+    results = {
+        "backend": f"sqlite {SQLiteConnection.version()}",
+        "insert_groups": _throughput(
+            lambda: upload.insert_groups(groups, progress=False), subgroups
+        ),
+        "insert_pairs": _throughput(
+            lambda: upload.insert_pairs(pairs, progress=False), len(pairs)
+        ),
+        "replace_pairs": _throughput(
+            lambda: upload.insert_pairs(pairs, progress=False), len(pairs)
+        ),
+        "sync_pairs_unchanged": _throughput(
+            lambda: upload.sync_pairs(pairs), len(pairs)
+        ),
+        "insert_exams_credits": _throughput(
+            lambda: upload.insert_exams_credits(exams_credits, progress=False),
+            len(exams_credits),
+        ),
+    }
+    results["rows"] = {
+        "pairs": _count_rows("pairs"),
+        "exams_credits": _count_rows("exams_credits"),
+    }
+    database.get_pool().close()
+    return results
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    spec = WorkbookSpec(
+        groups=args.groups,
+        subgroups=args.subgroups,
+        weeks=args.weeks,
+        pairs_per_day=args.pairs_per_day,
+        merge_density=args.merge_density,
+        seed=args.seed,
+    )
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="schedule-benchmark-") as workspace:
+        workspace = Path(workspace)
+        os.chdir(workspace)
+        try:
+            start = time.perf_counter()
+            paths = generate_dataset(
+                parse_xlsx.DATA_FOLDER, args.files, spec, exam_share=args.exam_share
+            )
+            generation_seconds = round(time.perf_counter() - start, 4)
+
+            groups, pairs, exams_credits = _parse_cold(1)
+            results = {
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "dataset": {
+                    "files": args.files,
+                    "groups": spec.groups,
+                    "subgroups": spec.subgroups,
+                    "weeks": spec.weeks,
+                    "pairs_per_day": spec.pairs_per_day,
+                    "merge_density": spec.merge_density,
+                    "seed": spec.seed,
+                    "exam_share": args.exam_share,
+                    "bytes": sum(path.stat().st_size for path in paths),
+                    "groups_found": len(groups),
+                    "pairs": len(pairs),
+                    "exams_credits": len(exams_credits),
+                    "generation_seconds": generation_seconds,
+                },
+                "parse": bench_parse(args.repeat, args.workers),
+                "stages": bench_stages(paths, args.repeat),
+            }
+            if not args.skip_memory:
+                results["memory"] = bench_memory()
+            if not args.skip_upload:
+                results["upload"] = bench_upload(workspace)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Замеры обработки и загрузки синтетических расписаний"
+    )
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--subgroups", type=int, default=2)
+    parser.add_argument("--weeks", type=int, default=2)
+    parser.add_argument("--pairs-per-day", type=int, default=4)
+    parser.add_argument("--merge-density", type=float, default=0.3)
+    parser.add_argument("--exam-share", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-memory", action="store_true")
+    parser.add_argument("--skip-upload", action="store_true")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    report = json.dumps(results, indent=4, ensure_ascii=False)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(report)
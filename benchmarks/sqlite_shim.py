@@ -0,0 +1,136 @@
+import re
+import sqlite3
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subgroups (
+    subgroup_name VARCHAR(22) NOT NULL,
+    group_name VARCHAR(20) NOT NULL,
+    course VARCHAR(1) NOT NULL,
+    faculty_name VARCHAR(60) NOT NULL,
+    specialty VARCHAR(255) NOT NULL,
+    form VARCHAR(2) NOT NULL,
+    PRIMARY KEY (subgroup_name, specialty)
+);
+
+CREATE TABLE IF NOT EXISTS pairs (
+    week_day VARCHAR(11) NOT NULL,
+    date DATE NOT NULL,
+    number VARCHAR(1) NOT NULL,
+    teacher VARCHAR(255),
+    auditorium VARCHAR(255),
+    name VARCHAR(300),
+    subgroup_name VARCHAR(22) NOT NULL,
+    specialty VARCHAR(255) NOT NULL,
+    UNIQUE (week_day, date, number, teacher, auditorium, name, subgroup_name, specialty)
+);
+CREATE INDEX IF NOT EXISTS idx_pairs_subgroup_date
+    ON pairs (subgroup_name, specialty, date, number);
+CREATE INDEX IF NOT EXISTS idx_pairs_teacher_date ON pairs (teacher, date, number);
+CREATE INDEX IF NOT EXISTS idx_pairs_auditorium_date
+    ON pairs (auditorium, date, number);
+
+CREATE TABLE IF NOT EXISTS exams_credits (
+    week_day VARCHAR(11) NOT NULL,
+    date DATE NOT NULL,
+    teacher VARCHAR(255),
+    auditorium VARCHAR(255),
+    name VARCHAR(300),
+    time VARCHAR(5),
+    subgroup_name VARCHAR(22) NOT NULL,
+    specialty VARCHAR(255) NOT NULL,
+    UNIQUE (week_day, date, name, subgroup_name, specialty)
+);
+CREATE INDEX IF NOT EXISTS idx_exams_credits_subgroup_date
+    ON exams_credits (subgroup_name, specialty, date);
+
+CREATE TABLE IF NOT EXISTS schedule_versions (
+    table_name VARCHAR(20) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO schedule_versions (table_name)
+    VALUES ('pairs'), ('exams_credits');
+"""
+
+_TRANSLATIONS = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bINSERT IGNORE\b", re.IGNORECASE), "INSERT OR IGNORE"),
+    (re.compile(r"<=>"), "IS"),
+]
+
+
+def translate(sql: str) -> str:
+    for pattern, replacement in _TRANSLATIONS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def _dict_row(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def __enter__(self) -> "SQLiteCursor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._cursor.close()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def execute(self, sql: str, args: Optional[Sequence] = None) -> int:
+        self._cursor.execute(translate(sql), tuple(args or ()))
+        return self._cursor.rowcount
+
+    def executemany(self, sql: str, args: Sequence[Sequence]) -> int:
+        self._cursor.executemany(translate(sql), args)
+        return self._cursor.rowcount
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        return self._cursor.fetchone()
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return self._cursor.fetchall()
+
+
+class SQLiteConnection:
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            timeout=60,
+        )
+        self._connection.row_factory = _dict_row
+        self._connection.executescript(SCHEMA)
+        self.open = True
+
+    @staticmethod
+    def version() -> str:
+        return sqlite3.sqlite_version
+
+    def ping(self, reconnect: bool = True) -> None:
+        if not self.open:
+            raise sqlite3.ProgrammingError("Соединение закрыто")
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self._connection.cursor())
+
+    def commit(self) -> None:
+        self._connection.commit()
+
+    def rollback(self) -> None:
+        self._connection.rollback()
+
+    def close(self) -> None:
+        self._connection.close()
+        self.open = False
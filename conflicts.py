@@ -0,0 +1,131 @@
+import argparse
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from parse_xlsx import get_parsed_data, parse_date_custom, Pair
+
+Slot = Tuple[date, str]
+Booking = Tuple[Optional[str], Optional[str]]
+Subgroup = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class Conflict:
+    date: date
+    number: str
+    kind: str
+    subject: str
+    bookings: Dict[Booking, Tuple[Subgroup, ...]]
+
+
+def _normalize(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = " ".join(str(value).split())
+    return value or None
+
+
+class _Normalized(dict):
+    def __missing__(self, value):
+        normalized = self[value] = _normalize(value)
+        return normalized
+
+
+def _add(index, slot: Slot, subject: str, booking: Booking, subgroup: Subgroup):
+    subjects = index.get(slot)
+    if subjects is None:
+        subjects = index[slot] = {}
+    bookings = subjects.get(subject)
+    if bookings is None:
+        bookings = subjects[subject] = {}
+    subgroups = bookings.get(booking)
+    if subgroups is None:
+        bookings[booking] = {subgroup}
+    else:
+        subgroups.add(subgroup)
+
+
+class ConflictIndex:
+    def __init__(self, pairs: Iterable[Pair]):
+        self.teachers: Dict[Slot, Dict[str, Dict[Booking, Set[Subgroup]]]] = {}
+        self.auditoriums: Dict[Slot, Dict[str, Dict[Booking, Set[Subgroup]]]] = {}
+        self.all_auditoriums: Set[str] = set()
+
+        normalized = _Normalized()
+        for pair in pairs:
+            teacher = normalized[pair.teacher]
+            auditorium = normalized[pair.auditorium]
+            name = normalized[pair.name]
+            slot = (pair.date, str(pair.number))
+            subgroup = (pair.subgroup, pair.specialty)
+            if teacher:
+                _add(self.teachers, slot, teacher, (name, auditorium), subgroup)
+            if auditorium:
+                _add(self.auditoriums, slot, auditorium, (name, teacher), subgroup)
+        for subjects in self.auditoriums.values():
+            self.all_auditoriums.update(subjects)
+
+    def _conflicts(self, index, kind: str, slots: Iterable[Slot]) -> Iterator[Conflict]:
+        for slot in slots:
+            for subject, bookings in index.get(slot, {}).items():
+                if len(bookings) > 1:
+                    yield Conflict(
+                        date=slot[0],
+                        number=slot[1],
+                        kind=kind,
+                        subject=subject,
+                        bookings={
+                            booking: tuple(sorted(subgroups))
+                            for booking, subgroups in bookings.items()
+                        },
+                    )
+
+    def conflicts(self, slot: Optional[Slot] = None) -> List[Conflict]:
+        teacher_slots = [slot] if slot else sorted(self.teachers)
+        auditorium_slots = [slot] if slot else sorted(self.auditoriums)
+        return [
+            *self._conflicts(self.teachers, "teacher", teacher_slots),
+            *self._conflicts(self.auditoriums, "auditorium", auditorium_slots),
+        ]
+
+    def free_auditoriums(self, slot: Slot) -> List[str]:
+        return sorted(self.all_auditoriums - set(self.auditoriums.get(slot, {})))
+
+
+def _print_conflict(conflict: Conflict) -> None:
+    kind = "Преподаватель" if conflict.kind == "teacher" else "Аудитория"
+    print(
+        f"{conflict.date.strftime('%d.%m.%Y')} пара {conflict.number} | "
+        f"{kind}: {conflict.subject}"
+    )
+    for (name, place), subgroups in conflict.bookings.items():
+        groups = ", ".join(subgroup for subgroup, _ in subgroups)
+        print(f"    {name} ({place}): {groups}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Пересечения преподавателей и аудиторий в расписании"
+    )
+    parser.add_argument("--date", help="дата в формате дд.мм.гггг")
+    parser.add_argument("--number", help="номер пары")
+    args = parser.parse_args()
+
+    _, pairs, _ = get_parsed_data()
+    index = ConflictIndex(pairs)
+
+    slot = None
+    if args.date and args.number:
+        slot = (parse_date_custom(args.date), args.number)
+    elif args.date or args.number:
+        parser.error("--date и --number указываются вместе")
+
+    conflicts = index.conflicts(slot)
+    for conflict in conflicts:
+        _print_conflict(conflict)
+    print(f"Найдено пересечений: {len(conflicts)}")
+
+    if slot:
+        free = index.free_auditoriums(slot)
+        print(f"Свободные аудитории ({len(free)}): {', '.join(free)}")
@@ -1,13 +1,142 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional
+
 import pymysql.cursors
+from pymysql.connections import Connection
 
 from settings import DATABASE
 
 
-connection = pymysql.connect(
-    host=DATABASE["HOST"],
-    user=DATABASE["USER"],
-    password=DATABASE["PASSWORD"],
-    database=DATABASE["NAME"],
-    port=DATABASE["PORT"],
-    cursorclass=pymysql.cursors.DictCursor,
-)
+def _connect(local_infile: bool = False) -> Connection:
+    return pymysql.connect(
+        host=DATABASE["HOST"],
+        user=DATABASE["USER"],
+        password=DATABASE["PASSWORD"],
+        database=DATABASE["NAME"],
+        port=DATABASE["PORT"],
+        cursorclass=pymysql.cursors.DictCursor,
+        local_infile=local_infile,
+    )
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        factory: Callable[[], Connection],
+        size: int,
+        timeout: Optional[float] = None,
+    ):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._idle: List[Connection] = []
+        self._created = 0
+        self._condition = threading.Condition()
+
+    def _reserve(self) -> Optional[Connection]:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(
+                        f"Нет свободного соединения с БД за {self.timeout} с"
+                    )
+                self._condition.wait(remaining)
+
+    def _release(self, connection: Connection) -> None:
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def _discard(self, connection: Optional[Connection]) -> None:
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+        if connection is None:
+            return
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _acquire(self) -> Connection:
+        connection = self._reserve()
+        if connection is None:
+            try:
+                connection = self.factory()
+            except Exception:
+                self._discard(None)
+                raise
+        try:
+            connection.ping(reconnect=True)
+        except Exception:
+            self._discard(connection)
+            raise
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        connection = self._acquire()
+        try:
+            yield connection
+        except BaseException:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            if connection.open:
+                self._release(connection)
+            else:
+                self._discard(connection)
+
+    def close(self) -> None:
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._discard(connection)
+
+
+_pools: Dict[bool, ConnectionPool] = {}
+_pool_lock = threading.Lock()
+
+
+def init_pool(
+    factory: Optional[Callable[[], Connection]] = None,
+    size: Optional[int] = None,
+    local_infile: bool = False,
+) -> ConnectionPool:
+    with _pool_lock:
+        if local_infile in _pools:
+            _pools[local_infile].close()
+        _pools[local_infile] = ConnectionPool(
+            factory or partial(_connect, local_infile),
+            size or DATABASE.get("POOL_SIZE", 4),
+            DATABASE.get("POOL_TIMEOUT"),
+        )
+        return _pools[local_infile]
+
+
+def get_pool(local_infile: bool = False) -> ConnectionPool:
+    with _pool_lock:
+        if local_infile not in _pools:
+            _pools[local_infile] = ConnectionPool(
+                partial(_connect, local_infile),
+                DATABASE.get("POOL_SIZE", 4),
+                DATABASE.get("POOL_TIMEOUT"),
+            )
+        return _pools[local_infile]
+
+
+def get_connection(local_infile: bool = False):
+    return get_pool(local_infile).connection()
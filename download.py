@@ -1,21 +1,35 @@
 import os
-import shutil
+import time
 
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import re
 import json
+import hashlib
 import logging
 
 from tqdm import tqdm
-from prompt_toolkit.shortcuts import checkboxlist_dialog, radiolist_dialog
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
-from settings import FACULTIES_URL, BASE_URL, DATA_FOLDER, STYLE
+from metrics import StageMetrics, metrics
+from settings import (
+    FACULTIES_URL,
+    BASE_URL,
+    DATA_FOLDER,
+    STYLE,
+    DOWNLOAD_MANIFEST,
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_BACKOFF,
+    DOWNLOAD_TIMEOUT,
+    DOWNLOAD_CHUNK_SIZE,
+)
 
 logging.basicConfig(level=logging.INFO)
 
@@ -38,14 +52,22 @@ class Schedule:
         return f"{self.faculty_short_name} {self.form} : {self.title}"
 
 
-def _update_faculties() -> None:
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=DOWNLOAD_WORKERS * 2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _update_faculties(session: requests.Session) -> None:
     faculties = []
 
     short_title = lambda faculty_title: "".join(
         f[0].upper() for f in faculty_title.replace("-", " ").split()
     )
 
-    response = requests.get(FACULTIES_URL)
+    response = session.get(FACULTIES_URL, timeout=DOWNLOAD_TIMEOUT)
     soup = BeautifulSoup(response.content, "html.parser")
     for link in soup.find_all("a"):
         href = link.get("href")
@@ -64,12 +86,6 @@ def _update_faculties() -> None:
         json.dump(faculties, file, indent=4, ensure_ascii=False)
 
 
-def _clear_data_dir():
-    if os.path.exists(DATA_FOLDER):
-        shutil.rmtree(DATA_FOLDER)
-    os.makedirs(DATA_FOLDER)
-
-
 def _load_faculties_from_file() -> List[Dict[str, str]]:
     try:
         with open("faculties.json", "r", encoding="utf-8") as file:
@@ -83,14 +99,43 @@ def _load_faculties_from_file() -> List[Dict[str, str]]:
         exit(1)
 
 
+def _dialog_style():
+    from prompt_toolkit.styles import Style
+
+    return Style.from_dict(STYLE)
+
+
+def _select_faculties(names: Iterable[str]) -> List[Dict[str, str]]:
+    faculties = _load_faculties_from_file()
+    names = [name.casefold() for name in names]
+    if not names:
+        return faculties
+
+    selected = []
+    for name in names:
+        matches = [
+            faculty
+            for faculty in faculties
+            if name == faculty["short"].casefold()
+            or name in faculty["title"].casefold()
+        ]
+        if not matches:
+            logging.error(f"Факультет '{name}' не найден в faculties.json")
+            exit(1)
+        selected.extend(faculty for faculty in matches if faculty not in selected)
+    return selected
+
+
 def _faculties_menu() -> List[Any]:
+    from prompt_toolkit.shortcuts import checkboxlist_dialog
+
     faculties = _load_faculties_from_file()
     menu_options = [(faculty, faculty["title"]) for faculty in faculties]
     selected_items = checkboxlist_dialog(
         title="Выбор факультетов",
         text="Ок для выбора всего",
         values=menu_options,
-        style=STYLE,
+        style=_dialog_style(),
     ).run()
 
     if selected_items is None:
@@ -103,11 +148,13 @@ def _faculties_menu() -> List[Any]:
 
 
 def _form_menu() -> str:
+    from prompt_toolkit.shortcuts import radiolist_dialog
+
     menu_options = [("all", "Все"), ("до", "ДО"), ("зо", "ЗО")]
     selected_item = radiolist_dialog(
         title="Выбор формы",
         values=menu_options,
-        style=STYLE,
+        style=_dialog_style(),
     ).run()
 
     if selected_item is None:
@@ -116,47 +163,99 @@ def _form_menu() -> str:
     return selected_item
 
 
-def _find_schedules(faculties: List[Dict[str, str]], form: str) -> List["Schedule"]:
+def _find_faculty_schedules(
+    session: requests.Session, faculty: Dict[str, str], form: str
+) -> List["Schedule"]:
     schedules: List["Schedule"] = []
 
-    with tqdm(faculties, desc="Поиск расписаний", ncols=150) as progress_bar:
-        for faculty in progress_bar:
-            faculty_name = faculty["title"]
-            faculty_short_name = faculty["short"]
-            faculty_url = faculty["url"]
+    with metrics.stage("download.find_schedules") as stage:
+        response = session.get(faculty["url"], timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        stage.bytes = len(response.content)
+    soup = BeautifulSoup(response.content, "html.parser")
+    for link in soup.find_all("a"):
+        href = link.get("href")
+        if (
+            href
+            and (".xlsx" in link.text or ".xlsx" in href)
+            and "Расписание" in link.text
+        ):
+            url = BASE_URL.format(urn=href)
+
+            if "зфпо" in href.lower():
+                detected_form = "зо"
+            else:
+                detected_form = "до"
+
+            if form == "all" or detected_form == form:
+                schedules.append(
+                    Schedule(
+                        faculty_name=faculty["title"],
+                        faculty_short_name=faculty["short"],
+                        url=url,
+                        form=detected_form,
+                        title=link.text,
+                    )
+                )
+    return schedules
 
+
+def _iter_schedules(
+    session: requests.Session,
+    faculties: List[Dict[str, str]],
+    form: str,
+    crawled: Optional[Dict[Path, Set[Path]]] = None,
+) -> Iterator["Schedule"]:
+    workers = max(1, min(len(faculties), DOWNLOAD_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers) as executor, tqdm(
+        total=len(faculties), desc="Поиск расписаний", ncols=150, position=0
+    ) as progress_bar:
+        futures = {
+            executor.submit(_find_faculty_schedules, session, faculty, form): faculty
+            for faculty in faculties
+        }
+        for future in as_completed(futures):
+            faculty_name = futures[future]["title"]
             progress_bar.set_description(f"Поиск в  '{faculty_name:<50}'")
+            progress_bar.update()
+            try:
+                schedules = future.result()
+            except requests.RequestException as e:
+                logging.error(f"Ошибка поиска расписаний '{faculty_name}': {e}")
+                continue
+            if crawled is not None and schedules:
+                for detected_form in ("до", "зо") if form == "all" else (form,):
+                    crawled[Path(DATA_FOLDER) / faculty_name / detected_form] = set()
+                for schedule in schedules:
+                    crawled[schedule.path].add(schedule.file)
+            yield from schedules
+
+
+def _find_schedules(
+    session: requests.Session,
+    faculties: List[Dict[str, str]],
+    form: str,
+    crawled: Optional[Dict[Path, Set[Path]]] = None,
+) -> List["Schedule"]:
+    order = {faculty["title"]: idx for idx, faculty in enumerate(faculties)}
+    return sorted(
+        _iter_schedules(session, faculties, form, crawled),
+        key=lambda schedule: order[schedule.faculty_name],
+    )
 
-            response = requests.get(faculty_url)
-            soup = BeautifulSoup(response.content, "html.parser")
-            for link in soup.find_all("a"):
-                href = link.get("href")
-                if (
-                    href
-                    and (".xlsx" in link.text or ".xlsx" in href)
-                    and "Расписание" in link.text
-                ):
-                    url = BASE_URL.format(urn=href)
-
-                    if "зфпо" in href.lower():
-                        detected_form = "зо"
-                    else:
-                        detected_form = "до"
-
-                    if form == "all" or detected_form == form:
-                        schedules.append(
-                            Schedule(
-                                faculty_name=faculty_name,
-                                faculty_short_name=faculty_short_name,
-                                url=url,
-                                form=detected_form,
-                                title=link.text,
-                            )
-                        )
-    return schedules
+
+def _filter_schedules(
+    schedules: Iterable["Schedule"], schedule_filter: Optional[str]
+) -> Iterable["Schedule"]:
+    if not schedule_filter:
+        return schedules
+    pattern = re.compile(schedule_filter, re.IGNORECASE)
+    return (schedule for schedule in schedules if pattern.search(str(schedule)))
 
 
 def _schedules_menu(schedules: List["Schedule"]) -> List:
+    from prompt_toolkit.shortcuts import checkboxlist_dialog
+
     faculty_tmp = schedules[0].faculty_name
     form_tmp = schedules[0].form
 
@@ -177,7 +276,7 @@ def _schedules_menu(schedules: List["Schedule"]) -> List:
         title="Выбор расписаний",
         text="Ок для выбора всего",
         values=menu_options,
-        style=STYLE,
+        style=_dialog_style(),
     ).run()
 
     if selected_items is None:
@@ -189,30 +288,224 @@ def _schedules_menu(schedules: List["Schedule"]) -> List:
     return [item for item in selected_items if isinstance(item, Schedule)]
 
 
-def _download_schedules(schedules: List["Schedule"]) -> None:
+def _load_manifest() -> Dict[str, Dict[str, Optional[str]]]:
+    try:
+        with open(DOWNLOAD_MANIFEST, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError:
+        logging.warning(f"Файл {DOWNLOAD_MANIFEST} поврежден, загрузка всех файлов")
+        return {}
+
+
+def _save_manifest(manifest: Dict[str, Dict[str, Optional[str]]]) -> None:
+    temp_file = f"{DOWNLOAD_MANIFEST}.part"
+    with open(temp_file, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=4, ensure_ascii=False)
+    os.replace(temp_file, DOWNLOAD_MANIFEST)
+
+
+def _file_hash(path: Path) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _local_copy_matches(
+    schedule: "Schedule", entry: Optional[Dict[str, Optional[str]]]
+) -> bool:
+    return bool(
+        entry
+        and entry["url"] == schedule.url
+        and os.path.exists(schedule.file)
+        and entry["sha256"] == _file_hash(schedule.file)
+    )
+
+
+def _conditional_headers(entry: Dict[str, Optional[str]]) -> Dict[str, str]:
+    headers = {}
+    if entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _fetch_file(
+    session: requests.Session,
+    schedule: "Schedule",
+    entry: Optional[Dict[str, Optional[str]]],
+    stage: StageMetrics,
+) -> Tuple[Dict[str, Optional[str]], bool]:
+    os.makedirs(schedule.path, exist_ok=True)
+    temp_file = schedule.file.with_name(f"{schedule.file.name}.part")
+    local_matches = _local_copy_matches(schedule, entry)
+    headers = _conditional_headers(entry) if local_matches else {}
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        try:
+            with session.get(
+                schedule.url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                if response.status_code == 304:
+                    return entry, False
+
+                file_hash = hashlib.sha256()
+                with open(temp_file, "wb") as file:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        file_hash.update(chunk)
+                        file.write(chunk)
+                        stage.bytes += len(chunk)
+
+                new_entry = {
+                    "url": schedule.url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "sha256": file_hash.hexdigest(),
+                    "uploaded_sha256": (entry or {}).get("uploaded_sha256"),
+                }
+            if local_matches and new_entry["sha256"] == entry["sha256"]:
+                os.remove(temp_file)
+                return new_entry, False
+            os.replace(temp_file, schedule.file)
+            return new_entry, True
+        except requests.RequestException as e:
+            client_error = e.response is not None and e.response.status_code < 500
+            if client_error or attempt == DOWNLOAD_RETRIES:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                raise
+            time.sleep(DOWNLOAD_BACKOFF * 2 ** (attempt - 1))
+
+
+def _remove_stale_files(
+    manifest: Dict[str, Dict[str, Optional[str]]],
+    crawled: Dict[Path, Set[Path]],
+) -> int:
+    stale_files = set()
+    for key in manifest:
+        file = Path(key)
+        if file.parent in crawled and file not in crawled[file.parent]:
+            stale_files.add(file)
+    for folder, files in crawled.items():
+        if os.path.isdir(folder):
+            stale_files.update(
+                file for file in folder.glob("*.xlsx") if file not in files
+            )
+
+    for file in stale_files:
+        manifest.pop(str(file), None)
+        if os.path.exists(file):
+            os.remove(file)
+    return len(stale_files)
+
+
+def _download_file(
+    session: requests.Session,
+    schedule: "Schedule",
+    entry: Optional[Dict[str, Optional[str]]],
+) -> Tuple[Dict[str, Optional[str]], bool]:
+    with metrics.stage("download.http", file=str(schedule.file)) as stage:
+        return _fetch_file(session, schedule, entry, stage)
+
+
+def _download_schedules(
+    session: requests.Session,
+    schedules: Iterable["Schedule"],
+    crawled: Optional[Dict[Path, Set[Path]]] = None,
+) -> List["Schedule"]:
+    changed_schedules: List["Schedule"] = []
+    manifest = _load_manifest()
+
     format_description = lambda data: data[:47] + "..." if len(data) > 47 else data
-    with tqdm(schedules, desc="Загрузка расписаний", ncols=150) as progress_bar:
-        for schedule in progress_bar:
-            response = requests.get(schedule.url, allow_redirects=True)
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor, tqdm(
+        total=0, desc="Загрузка расписаний", ncols=150, position=1
+    ) as progress_bar:
+
+        def report(future: Future) -> None:
+            schedule = futures.pop(future)
 
             description = format_description(str(schedule))
             progress_bar.set_description(f"Загрузка '{description:<50}'")
 
-            if schedule.path and not os.path.exists(schedule.path):
-                os.makedirs(schedule.path)
-            with open(schedule.file, "wb") as file:
-                file.write(response.content)
-
-
-def download() -> None:
-    if not os.path.exists("faculties.json"):
-        _update_faculties()
-    _clear_data_dir()
-    selected_faculties = _faculties_menu()
-    form = _form_menu()
-    schedules = _find_schedules(selected_faculties, form)
-    selected_schedules = _schedules_menu(schedules)
-    _download_schedules(selected_schedules)
+            try:
+                entry, changed = future.result()
+            except Exception as e:
+                logging.error(f"Ошибка загрузки {schedule}: {e}")
+            else:
+                manifest[str(schedule.file)] = entry
+                if changed or entry.get("uploaded_sha256") != entry["sha256"]:
+                    changed_schedules.append(schedule)
+            progress_bar.update()
+
+        futures: Dict[Future, "Schedule"] = {}
+        for schedule in schedules:
+            entry = manifest.get(str(schedule.file))
+            futures[executor.submit(_download_file, session, schedule, entry)] = (
+                schedule
+            )
+            progress_bar.total += 1
+            progress_bar.refresh()
+            for future in [future for future in futures if future.done()]:
+                report(future)
+
+        for future in as_completed(list(futures)):
+            report(future)
+
+    if crawled:
+        removed = _remove_stale_files(manifest, crawled)
+        if removed:
+            logging.info(f"Удалено устаревших расписаний: {removed}")
+    _save_manifest(manifest)
+    return changed_schedules
+
+
+def mark_uploaded(files: Optional[Iterable[str | Path]] = None) -> None:
+    manifest = _load_manifest()
+    if not manifest:
+        return
+    keys = manifest.keys() if files is None else {str(Path(file)) for file in files}
+    for key in keys:
+        entry = manifest.get(key)
+        if entry:
+            entry["uploaded_sha256"] = entry["sha256"]
+    _save_manifest(manifest)
+
+
+def download(
+    select_schedules: bool = True,
+    interactive: bool = True,
+    faculties: Iterable[str] = (),
+    form: str = "all",
+    schedule_filter: Optional[str] = None,
+    update_faculties: bool = False,
+) -> List["Schedule"]:
+    with _create_session() as session:
+        if update_faculties or not os.path.exists("faculties.json"):
+            _update_faculties(session)
+        if interactive:
+            selected_faculties = _faculties_menu()
+            form = _form_menu()
+        else:
+            selected_faculties = _select_faculties(faculties)
+        crawled: Dict[Path, Set[Path]] = {}
+        if interactive and select_schedules:
+            schedules = _find_schedules(session, selected_faculties, form, crawled)
+            schedules = _schedules_menu(
+                list(_filter_schedules(schedules, schedule_filter))
+            )
+        else:
+            schedules = _filter_schedules(
+                _iter_schedules(session, selected_faculties, form, crawled),
+                schedule_filter,
+            )
+        changed_schedules = _download_schedules(session, schedules, crawled)
+    logging.info(f"Изменено расписаний: {len(changed_schedules)}")
+    return changed_schedules
 
 
 if __name__ == "__main__":
@@ -4,4 +4,6 @@ DATABASE = {
     "PASSWORD": "your_db_user_password",
     "HOST": "localhost",
     "PORT": 3306,
+    "POOL_SIZE": 4,
+    "POOL_TIMEOUT": 300,  # секунд ожидания свободного соединения
 }
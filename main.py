@@ -1,20 +1,216 @@
-from download import download
-from parse_xlsx import get_parsed_data
-from upload import insert_exams_credits, insert_pairs, insert_groups
+import argparse
 
-if __name__ == "__main__":
+from metrics import metrics
+from settings import (
+    logging,
+    PARSE_WORKERS,
+    STREAM_UPLOAD,
+    UPLOAD_MODE,
+    UPLOAD_WORKERS,
+    METRICS_REPORT,
+    METRICS_PROMETHEUS,
+)
+
+
+def download_schedules(args=None):
+    from download import download
+
+    with metrics.stage("download") as stage:
+        if args is None:
+            schedules = download()
+        else:
+            schedules = download(
+                interactive=False,
+                faculties=args.faculty,
+                form=args.form,
+                schedule_filter=args.schedule,
+                update_faculties=args.update_faculties,
+            )
+        stage.rows = len(schedules)
+    return [schedule.file for schedule in schedules]
+
+
+def parse(paths=None, workers=PARSE_WORKERS):
+    from parse_xlsx import get_parsed_data
+
+    with metrics.stage("parse"):
+        groups, pairs, exams_credits = get_parsed_data(paths, workers)
+    logging.info(
+        f"Найдено групп: {len(groups)}, пар: {len(pairs)}, "
+        f"экзаменов и зачётов: {len(exams_credits)}"
+    )
+
+
+def upload_all(
+    changed_files,
+    mode=UPLOAD_MODE,
+    workers=UPLOAD_WORKERS,
+    parse_workers=PARSE_WORKERS,
+):
+    from parse_xlsx import get_parsed_data
+    from upload import upload_parallel, upload_records
+
+    with metrics.stage("parse"):
+        groups, pairs, exams_credits = get_parsed_data(changed_files, parse_workers)
+    if not groups:
+        return True
+    if workers > 1:
+        return upload_parallel(groups, pairs, exams_credits, workers=workers, mode=mode)
+    return upload_records(groups, pairs, exams_credits, mode=mode)
+
+
+def upload_streaming(changed_files, mode=UPLOAD_MODE, parse_workers=PARSE_WORKERS):
+    from parse_xlsx import iter_parsed_data
+    from upload import upload_records
+
+    uploaded = True
+    for parsed_file in iter_parsed_data(changed_files, parse_workers):
+        uploaded = (
+            upload_records(
+                parsed_file.groups,
+                parsed_file.pairs,
+                parsed_file.exams_credits,
+                mode=mode,
+            )
+            and uploaded
+        )
+    return uploaded
+
+
+def upload_files(
+    paths,
+    stream=STREAM_UPLOAD,
+    mode=UPLOAD_MODE,
+    workers=UPLOAD_WORKERS,
+    parse_workers=PARSE_WORKERS,
+):
+    from download import mark_uploaded
+
+    with metrics.stage("parse_upload"):
+        if stream:
+            uploaded = upload_streaming(paths, mode, parse_workers)
+        else:
+            uploaded = upload_all(paths, mode, workers, parse_workers)
+    if uploaded:
+        mark_uploaded(paths)
+    else:
+        logging.warning(
+            "Загрузка в БД завершилась с ошибками, "
+            "расписания будут загружены повторно при следующем запуске"
+        )
+
+
+def write_report():
+    report = metrics.report()
+    metrics.write_json(METRICS_REPORT, report)
+    if METRICS_PROMETHEUS:
+        metrics.write_prometheus(METRICS_PROMETHEUS, report)
+    logging.info(f"Отчет о запуске: {METRICS_REPORT}")
+
+
+def run_interactive():
     ask = lambda msg: input(f"{msg} (y/n): ").lower().strip()
     is_yes = lambda response: response in {"y", "yes", "д", "да"}
 
+    changed_files = None
     if is_yes(ask("Скачать расписания?")):
-        download()
+        changed_files = download_schedules()
 
     if is_yes(ask("Загрузить в бд?")):
-        groups, pairs, exams_credits = get_parsed_data()
-        if not groups:
-            exit(0)
-        insert_groups(groups)
-        if pairs:
-            insert_pairs(pairs)
-        if exams_credits:
-            insert_exams_credits(exams_credits)
+        upload_files(changed_files)
+
+
+def run_command(args):
+    paths = getattr(args, "paths", None) or None
+    if args.command in ("download", "all"):
+        paths = download_schedules(args)
+    if args.command == "parse":
+        parse(paths, args.workers)
+    if args.command in ("upload", "all"):
+        upload_files(paths, args.stream, args.mode, args.upload_workers, args.workers)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Скачивание, обработка и загрузка расписаний в БД. "
+        "Без команды запускается интерактивный режим."
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    download_options = argparse.ArgumentParser(add_help=False)
+    download_options.add_argument(
+        "--faculty",
+        action="append",
+        default=[],
+        help="краткое название или часть названия факультета, можно несколько раз "
+        "(по умолчанию все)",
+    )
+    download_options.add_argument(
+        "--form", choices=["all", "до", "зо"], default="all", help="форма обучения"
+    )
+    download_options.add_argument(
+        "--schedule", help="регулярное выражение для отбора расписаний по названию"
+    )
+    download_options.add_argument(
+        "--update-faculties",
+        action="store_true",
+        help="обновить faculties.json перед скачиванием",
+    )
+
+    parse_options = argparse.ArgumentParser(add_help=False)
+    parse_options.add_argument(
+        "--workers",
+        type=int,
+        default=PARSE_WORKERS,
+        help="процессов для обработки файлов",
+    )
+
+    upload_options = argparse.ArgumentParser(add_help=False)
+    upload_options.add_argument(
+        "--mode",
+        choices=["replace", "sync", "bulk"],
+        default=UPLOAD_MODE,
+        help="способ загрузки в БД",
+    )
+    upload_options.add_argument(
+        "--stream",
+        action=argparse.BooleanOptionalAction,
+        default=STREAM_UPLOAD,
+        help="загружать каждый файл сразу после обработки",
+    )
+    upload_options.add_argument(
+        "--upload-workers",
+        type=int,
+        default=UPLOAD_WORKERS,
+        help="потоков загрузки по факультетам (без --stream)",
+    )
+
+    paths_help = "файлы внутри DATA_FOLDER (по умолчанию все)"
+    commands.add_parser(
+        "download", parents=[download_options], help="скачать расписания"
+    )
+    parse_command = commands.add_parser(
+        "parse", parents=[parse_options], help="обработать файлы"
+    )
+    parse_command.add_argument("paths", nargs="*", help=paths_help)
+    upload_command = commands.add_parser(
+        "upload",
+        parents=[parse_options, upload_options],
+        help="обработать файлы и загрузить в БД",
+    )
+    upload_command.add_argument("paths", nargs="*", help=paths_help)
+    commands.add_parser(
+        "all",
+        parents=[download_options, parse_options, upload_options],
+        help="скачать, обработать и загрузить изменившиеся расписания",
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    args = _build_parser().parse_args()
+    if args.command is None:
+        run_interactive()
+    else:
+        run_command(args)
+    write_report()
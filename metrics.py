@@ -0,0 +1,163 @@
+import os
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class StageMetrics:
+    calls: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    peak_rss_growth_bytes: Optional[int] = None
+
+    def add(self, other: "StageMetrics") -> None:
+        self.calls += other.calls
+        self.seconds += other.seconds
+        self.rows += other.rows
+        self.bytes += other.bytes
+        if other.peak_rss_growth_bytes is not None:
+            self.peak_rss_growth_bytes = max(
+                self.peak_rss_growth_bytes or 0, other.peak_rss_growth_bytes
+            )
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.stages: Dict[str, StageMetrics] = {}
+        self.files: Dict[str, Dict[str, StageMetrics]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, name: str, stage: StageMetrics, file: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            self.stages.setdefault(name, StageMetrics()).add(stage)
+            if file is not None:
+                file_stages = self.files.setdefault(file, {})
+                file_stages.setdefault(name, StageMetrics()).add(stage)
+
+    @contextmanager
+    def stage(self, name: str, file: Optional[str] = None) -> Iterator[StageMetrics]:
+        stage = StageMetrics(calls=1)
+        peak_before = peak_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            if peak_before is not None:
+                stage.peak_rss_growth_bytes = peak_rss_bytes() - peak_before
+            self.record(name, stage, file)
+
+    def merge(self, stages: Dict[str, StageMetrics], file: Optional[str] = None):
+        for name, stage in stages.items():
+            self.record(name, stage, file)
+
+    def report(self) -> Dict[str, Any]:
+        finished_at = datetime.now()
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "finished_at": finished_at.isoformat(timespec="seconds"),
+                "wall_seconds": (finished_at - self.started_at).total_seconds(),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "children_peak_rss_bytes": peak_rss_bytes(children=True),
+                "stages": {
+                    name: asdict(stage) for name, stage in sorted(self.stages.items())
+                },
+                "files": {
+                    file: {name: asdict(stage) for name, stage in stages.items()}
+                    for file, stages in sorted(self.files.items())
+                },
+            }
+
+    def write_json(self, path: str, report: Optional[Dict[str, Any]] = None):
+        _write_atomic(
+            path, json.dumps(report or self.report(), indent=4, ensure_ascii=False)
+        )
+
+    def write_prometheus(self, path: str, report: Optional[Dict[str, Any]] = None):
+        report = report or self.report()
+        lines = []
+        series = [
+            ("calls", "Number of stage runs in the last run"),
+            ("seconds", "Wall time spent in the stage in the last run"),
+            ("rows", "Rows processed by the stage in the last run"),
+            ("bytes", "Bytes processed by the stage in the last run"),
+            (
+                "peak_rss_growth_bytes",
+                "Largest rise of the process peak RSS during one stage run",
+            ),
+        ]
+        for field_name, description in series:
+            metric = f"schedule_stage_{field_name}"
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} gauge")
+            for name, stage in report["stages"].items():
+                if stage[field_name] is not None:
+                    lines.append(f'{metric}{{stage="{name}"}} {stage[field_name]}')
+        lines.append("# HELP schedule_run_wall_seconds Wall time of the last run")
+        lines.append("# TYPE schedule_run_wall_seconds gauge")
+        lines.append(f"schedule_run_wall_seconds {report['wall_seconds']}")
+        lines.append("# HELP schedule_run_finished_seconds Finish time of the last run")
+        lines.append("# TYPE schedule_run_finished_seconds gauge")
+        lines.append(f"schedule_run_finished_seconds {time.time()}")
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _write_atomic(path: str, content: str) -> None:
+    temp_file = f"{path}.part"
+    with open(temp_file, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(temp_file, path)
+
+
+metrics = Metrics()
+
+
+def timed(name: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(records, *args, **kwargs):
+            with metrics.stage(name) as stage:
+                stage.rows = len(records)
+                return func(records, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def profile(
+    func: Callable, *args, output: Optional[str] = None, limit: int = 30, **kwargs
+) -> Any:
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    if output:
+        profiler.dump_stats(output)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(limit)
+    return result
@@ -0,0 +1,11 @@
+USE schedule_db;
+
+ALTER TABLE pairs
+    ADD INDEX idx_pairs_subgroup_date (subgroup_name, specialty, date, number),
+    ADD INDEX idx_pairs_teacher_date (teacher, date, number),
+    ADD INDEX idx_pairs_auditorium_date (auditorium, date, number);
+
+ALTER TABLE exams_credits
+    ADD INDEX idx_exams_credits_subgroup_date (subgroup_name, specialty, date),
+    ADD INDEX idx_exams_credits_teacher_date (teacher, date),
+    ADD INDEX idx_exams_credits_auditorium_date (auditorium, date);
@@ -0,0 +1,8 @@
+USE schedule_db;
+
+CREATE TABLE schedule_versions (
+    table_name VARCHAR(20) NOT NULL PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0
+);
+
+INSERT INTO schedule_versions (table_name) VALUES ('pairs'), ('exams_credits');
@@ -0,0 +1,5 @@
+USE schedule_db;
+
+ALTER TABLE exams_credits
+    DROP INDEX idx_exams_credits_teacher_date,
+    DROP INDEX idx_exams_credits_auditorium_date;
@@ -1,19 +1,48 @@
 import os
+import argparse
+import hashlib
 import logging
+import pickle
+import posixpath
 import re
-from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
-from datetime import datetime
+import sys
+import time
+import zipfile
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
 
 from tqdm import tqdm
 
 from openpyxl import load_workbook
-from openpyxl.cell.cell import MergedCell
 from openpyxl.worksheet.cell_range import CellRange
-from openpyxl.worksheet.merge import MergedCellRange
-from openpyxl.worksheet.worksheet import Worksheet
-
-from settings import DATA_FOLDER
+from openpyxl.styles.numbers import builtin_format_code, is_date_format
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.xml.constants import (
+    ARC_STYLE,
+    ARC_WORKBOOK,
+    ARC_WORKBOOK_RELS,
+    REL_NS,
+    SHEET_MAIN_NS,
+)
+from openpyxl.xml.functions import fromstring, iterparse
+
+from metrics import Metrics, StageMetrics, metrics, profile
+from settings import (
+    DATA_FOLDER,
+    PARSE_WORKERS,
+    PARSE_CACHE,
+    PARSE_CACHE_FOLDER,
+    PARSE_CACHE_MAX_AGE_DAYS,
+    FAST_XLSX_READER,
+)
+
+_PARSER_SOURCES = [__file__]
 
 
 @dataclass(frozen=True)
@@ -27,34 +56,79 @@ class Group:
     subgroups: Tuple[str, ...] = field(default_factory=tuple)
 
 
-def parse_date_custom(date_str):
-    month_mapping = {
-        "января": "01",
-        "февраля": "02",
-        "марта": "03",
-        "апреля": "04",
-        "мая": "05",
-        "июня": "06",
-        "июля": "07",
-        "августа": "08",
-        "сентября": "09",
-        "октября": "10",
-        "ноября": "11",
-        "декабря": "12",
-    }
+_MONTHS = {
+    "января": 1,
+    "февраля": 2,
+    "марта": 3,
+    "апреля": 4,
+    "мая": 5,
+    "июня": 6,
+    "июля": 7,
+    "августа": 8,
+    "сентября": 9,
+    "октября": 10,
+    "ноября": 11,
+    "декабря": 12,
+}
+_TEXT_DATE = re.compile(r"(\d{1,2})\s+(\w+)\s+(\d{4})(?:\s+г(?:ода?)?\.?)?")
+_NUMERIC_DATE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+
+
+@lru_cache(maxsize=4096)
+def parse_date_custom(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"Некорректная дата: {value!r}")
+
+    date_str = value.strip()
+    if match := _NUMERIC_DATE.fullmatch(date_str):
+        day, month, year = map(int, match.groups())
+    elif (match := _TEXT_DATE.fullmatch(date_str)) and (
+        month := _MONTHS.get(match[2].lower())
+    ):
+        day, year = int(match[1]), int(match[3])
+    else:
+        raise ValueError(f"Некорректная дата: {value!r}")
+
     try:
-        date_list = date_str.strip().split()[:3]
-        date_list[1] = month_mapping[date_list[1]]
-        date_str = ".".join(date_list)
-    except Exception as e:
-        pass
+        return date(year, month, day)
+    except ValueError:
+        raise ValueError(f"Некорректная дата: {value!r}") from None
 
-    parsed_date = datetime.strptime(date_str, "%d.%m.%Y").date()
-    return parsed_date
 
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
 
-@dataclass(frozen=True)
-class Pair:
+
+def _intern_fields(record) -> None:
+    for record_field in fields(record):
+        value = getattr(record, record_field.name)
+        object.__setattr__(record, record_field.name, _intern(value))
+
+
+def _restore_record(cls, state):
+    record = object.__new__(cls)
+    record.__setstate__(state)
+    _intern_fields(record)
+    return record
+
+
+class _CompactRecord:
+    __slots__ = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, "date", parse_date_custom(self.date))
+        _intern_fields(self)
+
+    def __reduce__(self):
+        return _restore_record, (type(self), self.__getstate__())
+
+
+@dataclass(frozen=True, slots=True)
+class Pair(_CompactRecord):
     week_day: str
     date: datetime.date
     number: int
@@ -64,12 +138,9 @@ class Pair:
     auditorium: Optional[str] = None
     name: Optional[str] = None
 
-    def __post_init__(self):
-        object.__setattr__(self, "date", parse_date_custom(self.date))
-
     @staticmethod
-    def get_week_day(ws, row, week_day) -> str:
-        week_day_column = ws.cell(row=row, column=Schedule.start_column - 3).value
+    def get_week_day(grid, layout, row, week_day) -> str:
+        week_day_column = grid.value(row, layout.start_column - 3)
         if week_day == "" or (
             week_day_column is not None and week_day != week_day_column
         ):
@@ -77,8 +148,8 @@ class Pair:
         return week_day
 
     @staticmethod
-    def get_pair_date(ws, row, pair_date) -> str:
-        pair_date_column = ws.cell(row=row, column=Schedule.start_column - 2).value
+    def get_pair_date(grid, layout, row, pair_date) -> str:
+        pair_date_column = grid.value(row, layout.start_column - 2)
         if pair_date == "" or (
             pair_date_column is not None and pair_date != pair_date_column
         ):
@@ -86,17 +157,17 @@ class Pair:
         return pair_date
 
     @staticmethod
-    def get_pair_number(ws, row) -> int:
-        number_column: str = ws.cell(row=row, column=Schedule.start_column - 1).value
+    def get_pair_number(grid, layout, row) -> int:
+        number_column: str = grid.value(row, layout.start_column - 1)
         return (
             number_column
             if number_column.isdigit()
-            else ws.cell(row=row - 1, column=Schedule.start_column - 1).value
+            else grid.value(row - 1, layout.start_column - 1)
         )
 
 
-@dataclass(frozen=True)
-class ExamCredit:
+@dataclass(frozen=True, slots=True)
+class ExamCredit(_CompactRecord):
     week_day: str
     date: datetime.date
     subgroup: str
@@ -106,61 +177,329 @@ class ExamCredit:
     auditorium: Optional[str] = None
     time: Optional[str] = None
 
-    def __post_init__(self):
-        object.__setattr__(self, "date", parse_date_custom(self.date))
+
+@dataclass(frozen=True, slots=True)
+class RowSlot:
+    row: int
+    week_day: str
+    date: Any
+    number: Optional[str] = None
+
+
+@dataclass
+class SheetLayout:
+    start_row: int = 0
+    start_column: int = 0
 
 
-class Schedule:
-    start_row = 0
-    start_column = 0
+@dataclass
+class ParsedFile:
+    file_path: str
+    groups: List[Group] = field(default_factory=list)
+    pairs: List[Pair] = field(default_factory=list)
+    exams_credits: List[ExamCredit] = field(default_factory=list)
+    error: Optional[str] = None
+    metrics: Dict[str, StageMetrics] = field(default_factory=dict)
 
 
-def _find_merged_range(cell, merged_ranges) -> MergedCellRange | None:
+def build_merged_index(
+    merged_ranges: Iterable[CellRange],
+) -> Dict[Tuple[int, int], CellRange]:
+    merged_index = {}
     for merged_range in merged_ranges:
-        if cell.coordinate in merged_range:
-            return merged_range
-    return None
+        for row, column in merged_range.cells:
+            merged_index[(row, column)] = merged_range
+    return merged_index
+
+
+@dataclass
+class SheetGrid:
+    rows: List[List[Any]]
+    merged_ranges: List[CellRange]
+    merged_index: Dict[Tuple[int, int], CellRange] = field(init=False)
+
+    def __post_init__(self):
+        self.merged_index = build_merged_index(self.merged_ranges)
+        for row, column in self.merged_index:
+            if not self.is_merged(row, column) or row > len(self.rows):
+                continue
+            if column <= len(self.rows[row - 1]):
+                self.rows[row - 1][column - 1] = None
+
+    def value(self, row: int, column: int) -> Any:
+        if 1 <= row <= len(self.rows):
+            values = self.rows[row - 1]
+            if 1 <= column <= len(values):
+                return values[column - 1]
+        return None
+
+    def merged_range(self, row: int, column: int) -> CellRange | None:
+        return self.merged_index.get((row, column))
+
+    def is_merged(self, row: int, column: int) -> bool:
+        merged_range = self.merged_index.get((row, column))
+        return merged_range is not None and (row, column) != (
+            merged_range.min_row,
+            merged_range.min_col,
+        )
+
+
+_ROW = f"{{{SHEET_MAIN_NS}}}row"
+_CELL = f"{{{SHEET_MAIN_NS}}}c"
+_VALUE = f"{{{SHEET_MAIN_NS}}}v"
+_FORMULA = f"{{{SHEET_MAIN_NS}}}f"
+_INLINE_STRING = f"{{{SHEET_MAIN_NS}}}is"
+_TEXT = f"{{{SHEET_MAIN_NS}}}t"
+_RUN = f"{{{SHEET_MAIN_NS}}}r"
+_MERGE_CELL = f"{{{SHEET_MAIN_NS}}}mergeCell"
+_STRING_ITEM = f"{{{SHEET_MAIN_NS}}}si"
+_WORKSHEET_REL = f"{REL_NS}/worksheet"
+_SHARED_STRINGS_REL = f"{REL_NS}/sharedStrings"
+
+
+class UnsupportedWorkbook(Exception):
+    pass
+
+
+def _rich_text(element) -> str:
+    snippets = []
+    text = element.find(_TEXT)
+    if text is not None and text.text is not None:
+        snippets.append(text.text)
+    for run in element.iterfind(_RUN):
+        text = run.findtext(_TEXT)
+        if text is not None:
+            snippets.append(text)
+    return "".join(snippets)
+
+
+def _read_shared_strings(archive: zipfile.ZipFile, path: Optional[str]) -> List[str]:
+    strings = []
+    if path is None:
+        return strings
+    with archive.open(path) as source:
+        for _, element in iterparse(source):
+            if element.tag == _STRING_ITEM:
+                strings.append(_rich_text(element).replace("x005F_", ""))
+                element.clear()
+    return strings
+
+
+def _read_date_styles(archive: zipfile.ZipFile) -> set:
+    if ARC_STYLE not in archive.namelist():
+        return set()
+    styles = fromstring(archive.read(ARC_STYLE))
+    custom_formats = {
+        int(num_fmt.get("numFmtId")): num_fmt.get("formatCode")
+        for num_fmt in styles.iterfind(f"{{{SHEET_MAIN_NS}}}numFmts/")
+    }
+    date_styles = set()
+    cell_styles = styles.iterfind(f"{{{SHEET_MAIN_NS}}}cellXfs/")
+    for idx, cell_style in enumerate(cell_styles):
+        num_fmt_id = int(cell_style.get("numFmtId", 0))
+        fmt = custom_formats.get(num_fmt_id) or builtin_format_code(num_fmt_id)
+        if fmt and is_date_format(fmt):
+            date_styles.add(idx)
+    return date_styles
+
+
+def _read_sheet_targets(
+    archive: zipfile.ZipFile,
+) -> Tuple[List[Tuple[str, str]], int, Optional[str]]:
+    targets = {}
+    shared_strings = None
+    for rel in fromstring(archive.read(ARC_WORKBOOK_RELS)):
+        target = rel.get("Target")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = (rel.get("Type"), target)
+        if rel.get("Type") == _SHARED_STRINGS_REL:
+            shared_strings = target
+
+    workbook = fromstring(archive.read(ARC_WORKBOOK))
+    active = 0
+    for view in workbook.iterfind(f"{{{SHEET_MAIN_NS}}}bookViews/"):
+        if view.get("activeTab") is not None:
+            active = int(view.get("activeTab"))
+            break
+    sheets = [
+        targets[sheet.get(f"{{{REL_NS}}}id")]
+        for sheet in workbook.iterfind(f"{{{SHEET_MAIN_NS}}}sheets/")
+    ]
+    return sheets, active, shared_strings
+
+
+def _find_active_sheet(archive: zipfile.ZipFile) -> Tuple[str, Optional[str]]:
+    sheets, active, shared_strings = _read_sheet_targets(archive)
+    if any(rel_type != _WORKSHEET_REL for rel_type, _ in sheets):
+        raise UnsupportedWorkbook("книга содержит листы-диаграммы")
+    return sheets[active][1], shared_strings
+
+
+def _read_merged_ranges(archive: zipfile.ZipFile, sheet_path: str) -> List[CellRange]:
+    merged_ranges = []
+    with archive.open(sheet_path) as source:
+        for _, element in iterparse(source):
+            if element.tag == _MERGE_CELL:
+                merged_ranges.append(CellRange(element.get("ref")))
+            element.clear()
+    return merged_ranges
+
+
+def _cast_number(value: str) -> int | float:
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _cell_value(cell, shared_strings: List[str], date_styles: set) -> Any:
+    data_type = cell.get("t", "n")
+    if data_type == "inlineStr":
+        inline_string = cell.find(_INLINE_STRING)
+        return None if inline_string is None else _rich_text(inline_string)
+    if cell.find(_FORMULA) is not None:
+        raise UnsupportedWorkbook(f"формула в ячейке {cell.get('r')}")
+
+    value = cell.findtext(_VALUE) or None
+    if value is None:
+        return None
+    if data_type == "s":
+        return shared_strings[int(value)]
+    if data_type == "n":
+        if int(cell.get("s", 0)) in date_styles:
+            raise UnsupportedWorkbook(f"дата в ячейке {cell.get('r')}")
+        return _cast_number(value)
+    if data_type == "b":
+        return bool(int(value))
+    if data_type in ("str", "e"):
+        return value
+    raise UnsupportedWorkbook(f"тип ячейки {data_type!r} в {cell.get('r')}")
+
+
+def _load_grid_fast(file_path: str) -> SheetGrid:
+    rows: List[List[Any]] = []
+    merged_ranges: List[CellRange] = []
+    with zipfile.ZipFile(file_path) as archive:
+        sheet_path, shared_strings_path = _find_active_sheet(archive)
+        shared_strings = _read_shared_strings(archive, shared_strings_path)
+        date_styles = _read_date_styles(archive)
+        with archive.open(sheet_path) as source:
+            row_idx = 0
+            for _, element in iterparse(source):
+                if element.tag == _ROW:
+                    row_idx = int(element.get("r", row_idx + 1))
+                    rows.extend([] for _ in range(row_idx - 1 - len(rows)))
+                    values = []
+                    column = 0
+                    for cell in element.iterfind(_CELL):
+                        coordinate = cell.get("r")
+                        if coordinate:
+                            column = column_index_from_string(
+                                coordinate.rstrip("0123456789")
+                            )
+                        else:
+                            column += 1
+                        values.extend(None for _ in range(column - len(values)))
+                        values[column - 1] = _cell_value(
+                            cell, shared_strings, date_styles
+                        )
+                    rows.append(values)
+                    element.clear()
+                elif element.tag == _MERGE_CELL:
+                    merged_ranges.append(CellRange(element.get("ref")))
+    return SheetGrid(rows=rows, merged_ranges=merged_ranges)
+
+
+def _load_grid_openpyxl(file_path: str) -> SheetGrid:
+    workbook = load_workbook(filename=file_path, read_only=True)
+    try:
+        worksheet = workbook.active
+        sheet_index = workbook.sheetnames.index(worksheet.title)
+        worksheet.reset_dimensions()
+        rows = [list(values) for values in worksheet.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+    with zipfile.ZipFile(file_path) as archive:
+        sheets, _, _ = _read_sheet_targets(archive)
+        merged_ranges = _read_merged_ranges(archive, sheets[sheet_index][1])
+    return SheetGrid(rows=rows, merged_ranges=merged_ranges)
+
+
+def _load_grid(file_path: str) -> SheetGrid:
+    if FAST_XLSX_READER:
+        try:
+            return _load_grid_fast(file_path)
+        except Exception as e:
+            logging.debug(f"Быстрое чтение {file_path} недоступно: {e}")
+    return _load_grid_openpyxl(file_path)
+
+
+def verify_fast_reader(paths: Optional[Iterable[str | Path]] = None) -> bool:
+    identical = True
+    for faculty, form, file in _get_all_files(paths):
+        file_path = os.path.join(DATA_FOLDER, faculty, form, file)
+        try:
+            fast_grid = _load_grid_fast(file_path)
+        except UnsupportedWorkbook as e:
+            print(f"openpyxl  {file_path}: {e}")
+            continue
+        grid = _load_grid_openpyxl(file_path)
+        same_rows = fast_grid.rows == grid.rows
+        same_merges = [str(r) for r in fast_grid.merged_ranges] == [
+            str(r) for r in grid.merged_ranges
+        ]
+        if same_rows and same_merges:
+            print(f"ok        {file_path}")
+        else:
+            identical = False
+            print(f"DIFFERENT {file_path}")
+    return identical
+
+
+_CREDIT_KEYWORDS = re.compile(r"зач[её]т|test")
+_EXAM_KEYWORDS = re.compile(r"экзамен|exam")
+_COURSE_HEADER = re.compile(r"\d (курс|year)")
 
 
 def _get_groups(
-    worksheet: Worksheet,
-    merged_ranges: set[CellRange],
+    grid: SheetGrid,
     faculty: str,
     form: str,
-) -> Tuple[List[Group], str]:
+) -> Tuple[List[Group], str, SheetLayout]:
     groups = []
     pair_type = "обыч"
-    for row in worksheet.iter_rows():
-        for cell in row:
-            cell_value = str(cell.value).lower()
-            if (
-                "зачет" in cell_value.lower()
-                or "зачёт" in cell_value.lower()
-                or "test" in cell_value.lower()
-            ):
+    layout = SheetLayout()
+    for row_idx, row in enumerate(grid.rows, start=1):
+        if layout.start_row and row_idx >= layout.start_row:
+            break
+        for column_idx, value in enumerate(row, start=1):
+            if value is None:
+                continue
+            cell_value = str(value).lower()
+            if _CREDIT_KEYWORDS.search(cell_value):
                 pair_type = "зач"
-            elif "экзамен" in cell_value.lower() or "exam" in cell_value.lower():
+            elif _EXAM_KEYWORDS.search(cell_value):
                 pair_type = "экз"
-            if re.match(r"\d (курс|year)", cell_value):
+            if _COURSE_HEADER.match(cell_value):
                 subgroups = []
                 course = int(cell_value[0])
-                specialty = worksheet.cell(row=cell.row + 1, column=cell.column).value
-                group_name = worksheet.cell(row=cell.row + 2, column=cell.column).value
+                specialty = grid.value(row_idx + 1, column_idx)
+                group_name = grid.value(row_idx + 2, column_idx)
                 if not all([course, specialty, group_name]):
                     continue
-                subgroups_row = cell.row + 3
-                merged_range = _find_merged_range(cell, merged_ranges)
-                max_column = merged_range.max_col if merged_range else cell.column
-                for col_idx in range(cell.column, max_column + 1):
-                    subgroup = str(
-                        worksheet.cell(row=subgroups_row, column=col_idx).value
-                    )
+                subgroups_row = row_idx + 3
+                merged_range = grid.merged_range(row_idx, column_idx)
+                max_column = merged_range.max_col if merged_range else column_idx
+                for col_idx in range(column_idx, max_column + 1):
+                    subgroup = str(grid.value(subgroups_row, col_idx))
                     if group_name in subgroup:
                         subgroups.append(subgroup)
                 if not subgroups:
                     continue
                 group = Group(
-                    column_range=range(cell.column, max_column + 1),
+                    column_range=range(column_idx, max_column + 1),
                     faculty=str(faculty),
                     name=str(group_name),
                     course=course,
@@ -169,46 +508,66 @@ def _get_groups(
                     form=form,
                 )
                 groups.append(group)
-                if not Schedule.start_row:
-                    Schedule.start_row = subgroups_row + 2
-                    Schedule.start_column = (
-                        merged_range.min_col if merged_range else cell.column
+                if not layout.start_row:
+                    layout.start_row = subgroups_row + 2
+                    layout.start_column = (
+                        merged_range.min_col if merged_range else column_idx
                     )
-    return groups, pair_type
+    return groups, pair_type, layout
+
+
+def _pair_slots(grid: SheetGrid, layout: SheetLayout) -> List[RowSlot]:
+    slots = []
+    row = layout.start_row
+    week_day = ""
+    pair_date = ""
+    while grid.value(row, layout.start_column - 1):
+        number = Pair.get_pair_number(grid=grid, layout=layout, row=row)
+        week_day = Pair.get_week_day(
+            grid=grid, layout=layout, row=row, week_day=week_day
+        )
+        pair_date = Pair.get_pair_date(
+            grid=grid, layout=layout, row=row, pair_date=pair_date
+        )
+        slots.append(RowSlot(row=row, week_day=week_day, date=pair_date, number=number))
+        row += 3
+        if not grid.value(row, layout.start_column - 1):
+            row += 1
+    return slots
+
+
+def _exam_credit_slots(grid: SheetGrid, layout: SheetLayout) -> List[RowSlot]:
+    slots = []
+    row = layout.start_row
+    while grid.value(row, layout.start_column - 1):
+        date_cell = grid.value(row, layout.start_column - 1).split(maxsplit=1)
+        slots.append(RowSlot(row=row, week_day=date_cell[1], date=date_cell[0]))
+        row += 1
+    return slots
 
 
-def _get_pairs(
-    ws: Worksheet, groups: List[Group], merged_ranges: set[CellRange]
-) -> List[Pair]:
+def _get_pairs(grid: SheetGrid, layout: SheetLayout, groups: List[Group]) -> List[Pair]:
     pairs = []
+    slots = _pair_slots(grid, layout)
     for group in groups:
         for idx, column in enumerate(group.column_range):
-            row = Schedule.start_row
-            week_day = ""
-            pair_date = ""
-            while ws.cell(row=row, column=Schedule.start_column - 1).value:
-
-                number = Pair.get_pair_number(ws=ws, row=row)
-                week_day = Pair.get_week_day(ws=ws, row=row, week_day=week_day)
-                pair_date = Pair.get_pair_date(ws=ws, row=row, pair_date=pair_date)
-
-                if isinstance(ws.cell(row=row, column=column), MergedCell):
-                    merged_range = _find_merged_range(
-                        ws.cell(row=row, column=column), merged_ranges
-                    )
-                    name = ws.cell(row=row, column=merged_range.min_col).value
-                    teacher = ws.cell(row=row + 1, column=merged_range.min_col).value
-                    auditorium = ws.cell(row=row + 2, column=merged_range.min_col).value
+            subgroup = group.subgroups[idx]
+            for slot in slots:
+                row = slot.row
+                if grid.is_merged(row, column):
+                    merged_range = grid.merged_range(row, column)
+                    name = grid.value(row, merged_range.min_col)
+                    teacher = grid.value(row + 1, merged_range.min_col)
+                    auditorium = grid.value(row + 2, merged_range.min_col)
                 else:
-                    name = ws.cell(row=row, column=column).value
-                    teacher = ws.cell(row=row + 1, column=column).value
-                    auditorium = ws.cell(row=row + 2, column=column).value
-                subgroup = group.subgroups[idx]
+                    name = grid.value(row, column)
+                    teacher = grid.value(row + 1, column)
+                    auditorium = grid.value(row + 2, column)
                 pairs.append(
                     Pair(
-                        week_day=week_day,
-                        date=pair_date,
-                        number=number,
+                        week_day=slot.week_day,
+                        date=slot.date,
+                        number=slot.number,
                         name=name,
                         teacher=teacher,
                         auditorium=auditorium,
@@ -216,36 +575,23 @@ def _get_pairs(
                         specialty=group.specialty,
                     )
                 )
-                row += 3
-                if not ws.cell(row=row, column=Schedule.start_column - 1).value:
-                    row += 1
     return pairs
 
 
 def _get_exam_credit(
-    ws: Worksheet, groups: List[Group], merged_ranges: set[CellRange]
+    grid: SheetGrid, layout: SheetLayout, groups: List[Group]
 ) -> List[ExamCredit]:
     pairs = []
+    slots = _exam_credit_slots(grid, layout)
     for group in groups:
         for idx, column in enumerate(group.column_range):
-            row = Schedule.start_row
-            while ws.cell(row=row, column=Schedule.start_column - 1).value:
-
-                date_cell = ws.cell(
-                    row=row, column=Schedule.start_column - 1
-                ).value.split(maxsplit=1)
-
-                week_day = date_cell[1]
-                pair_date = date_cell[0]
-
-                if isinstance(ws.cell(row=row, column=column), MergedCell):
-                    merged_range = _find_merged_range(
-                        ws.cell(row=row, column=column), merged_ranges
-                    )
-                    data = ws.cell(row=row, column=merged_range.min_col).value
+            subgroup = group.subgroups[idx]
+            for slot in slots:
+                if grid.is_merged(slot.row, column):
+                    merged_range = grid.merged_range(slot.row, column)
+                    data = grid.value(slot.row, merged_range.min_col)
                 else:
-                    data = ws.cell(row=row, column=column).value
-                subgroup = group.subgroups[idx]
+                    data = grid.value(slot.row, column)
                 try:
                     name, teacher, auditorium_time = data.rsplit("\n", maxsplit=2)
                     auditorium, time = auditorium_time.rsplit(",", maxsplit=1)
@@ -254,8 +600,8 @@ def _get_exam_credit(
                     name = teacher = auditorium = time = None
                 pairs.append(
                     ExamCredit(
-                        week_day=week_day,
-                        date=pair_date,
+                        week_day=slot.week_day,
+                        date=slot.date,
                         name=name,
                         teacher=teacher,
                         auditorium=auditorium,
@@ -264,57 +610,298 @@ def _get_exam_credit(
                         specialty=group.specialty,
                     )
                 )
-                row += 1
     return pairs
 
 
-def _get_all_files() -> List[Tuple[str, str, str]]:
+def _get_all_files(
+    paths: Optional[Iterable[str | Path]] = None,
+) -> List[Tuple[str, str, str]]:
     files_with_details = []
+    if paths is not None:
+        for path in paths:
+            faculty, form, file = Path(path).relative_to(DATA_FOLDER).parts
+            files_with_details.append((faculty, form, file))
+        return files_with_details
+
     for root, _, files in os.walk(DATA_FOLDER):
         if files:
             faculty, form = root.split(os.sep)[1:]
             for file in files:
-                files_with_details.append((faculty, form, file))
+                if file.endswith(".xlsx"):
+                    files_with_details.append((faculty, form, file))
     return files_with_details
 
 
-def get_parsed_data() -> Tuple[List[Group], List[Pair], List[ExamCredit]]:
-    all_pairs = []
-    all_groups = []
-    all_exams_credits = []
+def _parser_version() -> str:
+    version = hashlib.sha256()
+    for source in _PARSER_SOURCES:
+        with open(source, "rb") as file:
+            version.update(file.read())
+    return version.hexdigest()[:16]
 
-    files_with_details = _get_all_files()
 
-    format_description = lambda data: data[:47] + "..." if len(data) > 47 else data
+PARSER_VERSION = _parser_version()
 
-    with tqdm(files_with_details, desc="Обработка данных", ncols=150) as progress_bar:
-        for faculty, form, file in progress_bar:
-            Schedule.start_row = 0
-            Schedule.start_column = 0
 
-            description = format_description(str(file))
-            progress_bar.set_description(f"Обработка '{description:<50}'")
+def _cache_path(file_path: str, faculty: str, form: str) -> str:
+    key = hashlib.sha256(f"{PARSER_VERSION}\0{faculty}\0{form}\0".encode())
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            key.update(chunk)
+    return os.path.join(
+        PARSE_CACHE_FOLDER, f"{PARSER_VERSION}-{key.hexdigest()}.pickle.z"
+    )
 
-            file_path = os.path.join("data", faculty, form, file)
 
-            workbook = load_workbook(filename=file_path)
-            worksheet = workbook.active
-            merged_ranges = worksheet.merged_cells.ranges
+def _load_cached(cache_path: str) -> Optional[ParsedFile]:
+    try:
+        with open(cache_path, "rb") as file:
+            parsed_file = pickle.loads(zlib.decompress(file.read()))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Поврежденный кэш {cache_path}: {e}")
+        return None
+    try:
+        os.utime(cache_path)
+    except OSError:
+        pass
+    return parsed_file
 
-            groups, pair_type = _get_groups(worksheet, merged_ranges, faculty, form)
-            if not groups:
-                continue
-            all_groups.extend(groups)
-            try:
-                if pair_type == "обыч":
-                    pairs = _get_pairs(worksheet, groups, merged_ranges)
-                    all_pairs.extend(pairs)
-                else:
-                    pairs = _get_exam_credit(worksheet, groups, merged_ranges)
-                    all_exams_credits.extend(pairs)
-            except Exception as e:
-                print("")
-                logging.error(f"{e}\nfile : {file_path}\n")
+
+def _store_cached(cache_path: str, parsed_file: ParsedFile) -> None:
+    os.makedirs(PARSE_CACHE_FOLDER, exist_ok=True)
+    temp_path = f"{cache_path}.{os.getpid()}.part"
+    data = pickle.dumps(parsed_file, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        with open(temp_path, "wb") as file:
+            file.write(zlib.compress(data))
+        os.replace(temp_path, cache_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _evict_cache() -> None:
+    if not os.path.isdir(PARSE_CACHE_FOLDER):
+        return
+    expires = time.time() - PARSE_CACHE_MAX_AGE_DAYS * 24 * 60 * 60
+    removed = 0
+    for entry in os.scandir(PARSE_CACHE_FOLDER):
+        try:
+            if (
+                not entry.name.startswith(f"{PARSER_VERSION}-")
+                or entry.stat().st_mtime < expires
+            ):
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logging.warning(f"Не удалось удалить кэш {entry.path}: {e}")
+    if removed:
+        logging.info(f"Удалено устаревших записей кэша: {removed}")
+
+
+def _parse_workbook(
+    file_path: str, faculty: str, form: str, file_metrics: Metrics
+) -> ParsedFile:
+    parsed_file = ParsedFile(file_path=file_path)
+
+    with file_metrics.stage("parse.load_grid") as stage:
+        grid = _load_grid(file_path)
+        stage.rows = len(grid.rows)
+        stage.bytes = os.path.getsize(file_path)
+
+    with file_metrics.stage("parse.groups") as stage:
+        groups, pair_type, layout = _get_groups(grid, faculty, form)
+        stage.rows = len(groups)
+    if not groups:
+        return parsed_file
+    parsed_file.groups = groups
+
+    try:
+        if pair_type == "обыч":
+            with file_metrics.stage("parse.pairs") as stage:
+                parsed_file.pairs = _get_pairs(grid, layout, groups)
+                stage.rows = len(parsed_file.pairs)
+        else:
+            with file_metrics.stage("parse.exams_credits") as stage:
+                parsed_file.exams_credits = _get_exam_credit(grid, layout, groups)
+                stage.rows = len(parsed_file.exams_credits)
+    except Exception as e:
+        parsed_file.error = f"{type(e).__name__}: {e}"
+    return parsed_file
+
+
+def _parse_or_load(
+    file_path: str, faculty: str, form: str, file_metrics: Metrics
+) -> ParsedFile:
+    if not PARSE_CACHE:
+        return _parse_workbook(file_path, faculty, form, file_metrics)
+
+    with file_metrics.stage("parse.cache_load") as stage:
+        cache_path = _cache_path(file_path, faculty, form)
+        parsed_file = _load_cached(cache_path)
+        stage.bytes = os.path.getsize(file_path)
+        if parsed_file is not None:
+            stage.rows = len(parsed_file.pairs) + len(parsed_file.exams_credits)
+    if parsed_file is not None:
+        parsed_file.file_path = file_path
+        return parsed_file
+
+    parsed_file = _parse_workbook(file_path, faculty, form, file_metrics)
+    if parsed_file.error:
+        return parsed_file
+    with file_metrics.stage("parse.cache_store"):
+        try:
+            _store_cached(cache_path, parsed_file)
+        except Exception as e:
+            logging.warning(f"Не удалось сохранить кэш {cache_path}: {e}")
+    return parsed_file
+
+
+def _parse_file(faculty: str, form: str, file: str) -> ParsedFile:
+    file_path = os.path.join(DATA_FOLDER, faculty, form, file)
+    file_metrics = Metrics()
+    try:
+        parsed_file = _parse_or_load(file_path, faculty, form, file_metrics)
+    except Exception as e:
+        parsed_file = ParsedFile(file_path=file_path, error=f"{type(e).__name__}: {e}")
+    parsed_file.metrics = file_metrics.stages
+    return parsed_file
+
+
+def parse_files(
+    files_with_details: List[Tuple[str, str, str]],
+    workers: int = PARSE_WORKERS,
+) -> Iterator[ParsedFile]:
+    if workers <= 1 or len(files_with_details) <= 1:
+        for faculty, form, file in files_with_details:
+            yield _parse_file(faculty, form, file)
+        return
+
+    files = iter(files_with_details)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {
+            executor.submit(_parse_file, faculty, form, file)
+            for faculty, form, file in islice(files, workers)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for faculty, form, file in islice(files, 1):
+                    pending.add(executor.submit(_parse_file, faculty, form, file))
+                yield future.result()
+
+
+def _record_key(record: Pair | ExamCredit) -> Tuple:
+    return record.date, record.subgroup, record.specialty
+
+
+class _KeyWriters:
+    def __init__(self):
+        self.writers: Dict[Tuple, Tuple[str, ...]] = {}
+
+    def earlier(self, records: List) -> Dict[str, set]:
+        sources: Dict[str, set] = {}
+        for key in {_record_key(record) for record in records}:
+            for file_path in self.writers.get(key, ()):
+                sources.setdefault(file_path, set()).add(key)
+        return sources
+
+    def add(self, file_path: str, records: List) -> None:
+        file_path = sys.intern(file_path)
+        for key in {_record_key(record) for record in records}:
+            self.writers[key] = self.writers.get(key, ()) + (file_path,)
+
+
+def _reload_parsed_file(file_path: str) -> ParsedFile:
+    faculty, form, file = Path(file_path).relative_to(DATA_FOLDER).parts
+    parsed_file = _parse_file(faculty, form, file)
+    if parsed_file.error:
+        logging.error(f"{parsed_file.error}\nfile : {parsed_file.file_path}\n")
+    return parsed_file
+
+
+def _iter_parsed_files(
+    paths: Optional[Iterable[str | Path]], workers: int
+) -> Iterator[ParsedFile]:
+    errors = []
+
+    if PARSE_CACHE:
+        _evict_cache()
+    files_with_details = _get_all_files(paths)
+
+    format_description = lambda data: data[:47] + "..." if len(data) > 47 else data
+
+    with tqdm(
+        parse_files(files_with_details, workers),
+        total=len(files_with_details),
+        desc="Обработка данных",
+        ncols=150,
+    ) as progress_bar:
+        for parsed_file in progress_bar:
+            description = format_description(os.path.basename(parsed_file.file_path))
+            progress_bar.set_description(f"Обработка '{description:<50}'")
+
+            metrics.merge(parsed_file.metrics, file=parsed_file.file_path)
+            if parsed_file.error:
+                errors.append(parsed_file)
+            yield parsed_file
+
+    for parsed_file in errors:
+        logging.error(f"{parsed_file.error}\nfile : {parsed_file.file_path}\n")
+
+
+def iter_parsed_data(
+    paths: Optional[Iterable[str | Path]] = None,
+    workers: int = PARSE_WORKERS,
+) -> Iterator[ParsedFile]:
+    seen_groups = set()
+    pairs_writers = _KeyWriters()
+    exams_credits_writers = _KeyWriters()
+
+    for parsed_file in _iter_parsed_files(paths, workers):
+        parsed_file.groups = [
+            group
+            for group in dict.fromkeys(parsed_file.groups)
+            if group not in seen_groups
+        ]
+        seen_groups.update(parsed_file.groups)
+
+        pairs_sources = pairs_writers.earlier(parsed_file.pairs)
+        exams_credits_sources = exams_credits_writers.earlier(parsed_file.exams_credits)
+        for file_path in pairs_sources.keys() | exams_credits_sources.keys():
+            earlier_file = _reload_parsed_file(file_path)
+            keys = pairs_sources.get(file_path, ())
+            parsed_file.pairs.extend(
+                pair for pair in earlier_file.pairs if _record_key(pair) in keys
+            )
+            keys = exams_credits_sources.get(file_path, ())
+            parsed_file.exams_credits.extend(
+                exam_credit
+                for exam_credit in earlier_file.exams_credits
+                if _record_key(exam_credit) in keys
+            )
+
+        parsed_file.pairs = list(dict.fromkeys(parsed_file.pairs))
+        parsed_file.exams_credits = list(dict.fromkeys(parsed_file.exams_credits))
+        pairs_writers.add(parsed_file.file_path, parsed_file.pairs)
+        exams_credits_writers.add(parsed_file.file_path, parsed_file.exams_credits)
+        yield parsed_file
+
+
+def get_parsed_data(
+    paths: Optional[Iterable[str | Path]] = None,
+    workers: int = PARSE_WORKERS,
+) -> Tuple[List[Group], List[Pair], List[ExamCredit]]:
+    all_pairs = []
+    all_groups = []
+    all_exams_credits = []
+
+    for parsed_file in _iter_parsed_files(paths, workers):
+        all_groups.extend(parsed_file.groups)
+        all_pairs.extend(parsed_file.pairs)
+        all_exams_credits.extend(parsed_file.exams_credits)
 
     unique = lambda data: list(set(data))
 
@@ -326,7 +913,37 @@ def get_parsed_data() -> Tuple[List[Group], List[Pair], List[ExamCredit]]:
 
 
 if __name__ == "__main__":
-    groups, pairs, exams_credits = get_parsed_data()
+    parser = argparse.ArgumentParser(description="Обработка файлов расписаний")
+    parser.add_argument("paths", nargs="*", help="файлы внутри DATA_FOLDER")
+    parser.add_argument(
+        "--verify-fast-reader",
+        action="store_true",
+        help="сравнить быстрое чтение xlsx с openpyxl",
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="профилировать обработку файлов"
+    )
+    parser.add_argument("--profile-output", help="файл для статистики cProfile")
+    args = parser.parse_args()
+
+    if args.verify_fast_reader:
+        exit(0 if verify_fast_reader(args.paths or None) else 1)
+
+    if args.profile:
+        for faculty, form, file in _get_all_files(args.paths or None):
+            file_path = os.path.join(DATA_FOLDER, faculty, form, file)
+            print(file_path)
+            profile(
+                _parse_workbook,
+                file_path,
+                faculty,
+                form,
+                Metrics(),
+                output=args.profile_output,
+            )
+        exit(0)
+
+    groups, pairs, exams_credits = get_parsed_data(args.paths or None)
     print(f"Найдено групп: {len(groups)}")
     print(f"Найдено пар: {len(pairs)}")
     print(f"Найдено экзаменов и зачётов: {len(exams_credits)}")
@@ -0,0 +1,232 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from settings import logging, CACHE_MAX_SIZE, CACHE_TTL, CACHE_VERSION_CHECK
+from cache import CacheStats, TTLCache
+from database import get_connection
+
+cache = TTLCache(max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL)
+
+_versions: Dict[str, int] = {}
+_versions_checked_at: Optional[float] = None
+_versions_lock = threading.Lock()
+
+SUBGROUP_PAIRS = """
+SELECT week_day, date, number, teacher, auditorium, name, subgroup_name, specialty
+FROM pairs
+WHERE subgroup_name = %s AND specialty = %s AND date BETWEEN %s AND %s
+ORDER BY date, number;
+"""
+
+SUBGROUP_PAIRS_ANY_SPECIALTY = """
+SELECT week_day, date, number, teacher, auditorium, name, subgroup_name, specialty
+FROM pairs
+WHERE subgroup_name = %s AND date BETWEEN %s AND %s
+ORDER BY date, number;
+"""
+
+SUBGROUP_EXAMS_CREDITS = """
+SELECT week_day, date, time, teacher, auditorium, name, subgroup_name, specialty
+FROM exams_credits
+WHERE subgroup_name = %s AND specialty = %s AND date BETWEEN %s AND %s
+ORDER BY date, time;
+"""
+
+TEACHER_PAIRS = """
+SELECT week_day, date, number, auditorium, name, subgroup_name, specialty
+FROM pairs
+WHERE teacher = %s AND date BETWEEN %s AND %s
+ORDER BY date, number;
+"""
+
+AUDITORIUM_PAIRS = """
+SELECT date, number, teacher, name, subgroup_name, specialty
+FROM pairs
+WHERE auditorium = %s AND date BETWEEN %s AND %s
+ORDER BY date, number;
+"""
+
+
+def _fetch_all(sql: str, args: Tuple) -> List[Dict[str, Any]]:
+    with get_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(sql, args)
+        rows = list(cursor.fetchall())
+        connection.commit()
+    return rows
+
+
+def bump_schedule_version(cursor, table: str) -> None:
+    cursor.execute(
+        "UPDATE schedule_versions SET version = version + 1 WHERE table_name = %s;",
+        (table,),
+    )
+
+
+def _check_versions() -> None:
+    global _versions_checked_at
+    with _versions_lock:
+        now = time.monotonic()
+        if (
+            _versions_checked_at is not None
+            and now - _versions_checked_at < CACHE_VERSION_CHECK
+        ):
+            return
+        _versions_checked_at = now
+        versions = {
+            row["table_name"]: row["version"]
+            for row in _fetch_all(
+                "SELECT table_name, version FROM schedule_versions;", ()
+            )
+        }
+        changed = {
+            table
+            for table, version in versions.items()
+            if _versions.get(table, version) != version
+        }
+        _versions.update(versions)
+    if changed:
+        cache.invalidate(lambda key: key[0] in changed)
+
+
+def schedule_for_subgroup(
+    subgroup_name: str,
+    date_from: date,
+    date_to: date,
+    specialty: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    _check_versions()
+    key = ("pairs", "subgroup", subgroup_name, specialty, date_from, date_to)
+    if specialty is None:
+        return cache.get_or_load(
+            key,
+            lambda: _fetch_all(
+                SUBGROUP_PAIRS_ANY_SPECIALTY, (subgroup_name, date_from, date_to)
+            ),
+        )
+    return cache.get_or_load(
+        key,
+        lambda: _fetch_all(
+            SUBGROUP_PAIRS, (subgroup_name, specialty, date_from, date_to)
+        ),
+    )
+
+
+def exams_credits_for_subgroup(
+    subgroup_name: str, specialty: str, date_from: date, date_to: date
+) -> List[Dict[str, Any]]:
+    _check_versions()
+    key = ("exams_credits", "subgroup", subgroup_name, specialty, date_from, date_to)
+    return cache.get_or_load(
+        key,
+        lambda: _fetch_all(
+            SUBGROUP_EXAMS_CREDITS, (subgroup_name, specialty, date_from, date_to)
+        ),
+    )
+
+
+def schedule_for_teacher(
+    teacher: str, date_from: date, date_to: date
+) -> List[Dict[str, Any]]:
+    _check_versions()
+    key = ("pairs", "teacher", teacher, None, date_from, date_to)
+    return cache.get_or_load(
+        key, lambda: _fetch_all(TEACHER_PAIRS, (teacher, date_from, date_to))
+    )
+
+
+def auditorium_occupancy(
+    auditorium: str, date_from: date, date_to: date
+) -> List[Dict[str, Any]]:
+    _check_versions()
+    key = ("pairs", "auditorium", auditorium, None, date_from, date_to)
+    return cache.get_or_load(
+        key, lambda: _fetch_all(AUDITORIUM_PAIRS, (auditorium, date_from, date_to))
+    )
+
+
+def _has_date_between(dates: List[date], date_from: date, date_to: date) -> bool:
+    idx = bisect_left(dates, date_from)
+    return idx < len(dates) and dates[idx] <= date_to
+
+
+def invalidate_schedules(table: str, keys: Iterable[Tuple[date, str, str]]) -> int:
+    subgroup_dates = defaultdict(set)
+    all_dates = set()
+    for day, subgroup_name, specialty in keys:
+        subgroup_dates[(subgroup_name, specialty)].add(day)
+        subgroup_dates[(subgroup_name, None)].add(day)
+        all_dates.add(day)
+    if not all_dates:
+        return 0
+
+    sorted_dates = {key: sorted(dates) for key, dates in subgroup_dates.items()}
+    sorted_all_dates = sorted(all_dates)
+
+    def is_stale(key: Hashable) -> bool:
+        key_table, kind, subject, specialty, date_from, date_to = key
+        if key_table != table:
+            return False
+        if kind == "subgroup":
+            dates = sorted_dates.get((subject, specialty))
+            return dates is not None and _has_date_between(dates, date_from, date_to)
+        return _has_date_between(sorted_all_dates, date_from, date_to)
+
+    return cache.invalidate(is_stale)
+
+
+def cache_stats() -> CacheStats:
+    return cache.stats
+
+
+def check_query_plans() -> List[Dict[str, Any]]:
+    full_scans = []
+    with get_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT subgroup_name, specialty, teacher, auditorium, date FROM pairs "
+            "WHERE teacher IS NOT NULL AND auditorium IS NOT NULL LIMIT 1;"
+        )
+        sample = cursor.fetchone()
+        if sample is None:
+            connection.commit()
+            logging.warning("Таблица pairs пуста, планы запросов не проверены")
+            return full_scans
+
+        day = sample["date"]
+        queries = {
+            "schedule_for_subgroup": (
+                SUBGROUP_PAIRS,
+                (sample["subgroup_name"], sample["specialty"], day, day),
+            ),
+            "schedule_for_subgroup (без специальности)": (
+                SUBGROUP_PAIRS_ANY_SPECIALTY,
+                (sample["subgroup_name"], day, day),
+            ),
+            "exams_credits_for_subgroup": (
+                SUBGROUP_EXAMS_CREDITS,
+                (sample["subgroup_name"], sample["specialty"], day, day),
+            ),
+            "schedule_for_teacher": (TEACHER_PAIRS, (sample["teacher"], day, day)),
+            "auditorium_occupancy": (
+                AUDITORIUM_PAIRS,
+                (sample["auditorium"], day, day),
+            ),
+        }
+        for name, (sql, args) in queries.items():
+            cursor.execute(f"EXPLAIN {sql}", args)
+            for plan in cursor.fetchall():
+                logging.info(f"{name}: type={plan['type']}, key={plan['key']}")
+                if plan["type"] == "ALL":
+                    full_scans.append({"query": name, **plan})
+        connection.commit()
+    return full_scans
+
+
+if __name__ == "__main__":
+    full_scans = check_query_plans()
+    for plan in full_scans:
+        logging.error(f"Полный просмотр таблицы: {plan['query']} ({plan['table']})")
+    exit(1 if full_scans else 0)
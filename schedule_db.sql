@@ -21,7 +21,10 @@ CREATE TABLE pairs (
     subgroup_name VARCHAR(22) NOT NULL,
     specialty VARCHAR(255) NOT NULL,
     FOREIGN KEY (subgroup_name, specialty) REFERENCES subgroups (subgroup_name, specialty) ON DELETE CASCADE,
-    UNIQUE (week_day, date, number, teacher, auditorium, name, subgroup_name, specialty)
+    UNIQUE (week_day, date, number, teacher, auditorium, name, subgroup_name, specialty),
+    INDEX idx_pairs_subgroup_date (subgroup_name, specialty, date, number),
+    INDEX idx_pairs_teacher_date (teacher, date, number),
+    INDEX idx_pairs_auditorium_date (auditorium, date, number)
 );
 
 CREATE TABLE exams_credits (
@@ -34,5 +37,13 @@ CREATE TABLE exams_credits (
     subgroup_name VARCHAR(22) NOT NULL,
     specialty VARCHAR(255) NOT NULL,
     FOREIGN KEY (subgroup_name, specialty) REFERENCES subgroups (subgroup_name, specialty) ON DELETE CASCADE,
-    UNIQUE (week_day, date, name, subgroup_name, specialty)
-);
\ No newline at end of file
+    UNIQUE (week_day, date, name, subgroup_name, specialty),
+    INDEX idx_exams_credits_subgroup_date (subgroup_name, specialty, date)
+);
+
+CREATE TABLE schedule_versions (
+    table_name VARCHAR(20) NOT NULL PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0
+);
+
+INSERT INTO schedule_versions (table_name) VALUES ('pairs'), ('exams_credits');
\ No newline at end of file
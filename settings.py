@@ -1,32 +1,55 @@
+import os
 import logging
 
-from prompt_toolkit.styles import Style
-
 logging.basicConfig(level=logging.INFO)
 
 FACULTIES_URL = "https://vsu.by/studentam/raspisanie-zanyatij.html"
 BASE_URL = "https://vsu.by{urn}"
 
 DATA_FOLDER = "data"
+DOWNLOAD_MANIFEST = "download_manifest.json"
+
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_BACKOFF = 0.5
+DOWNLOAD_TIMEOUT = 30
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_CACHE = True
+PARSE_CACHE_FOLDER = ".parse_cache"
+PARSE_CACHE_MAX_AGE_DAYS = 30
+FAST_XLSX_READER = True
+
+STREAM_UPLOAD = True
+
+UPLOAD_BATCH_SIZE = 1000
+UPLOAD_MODE = "replace"  # replace | sync | bulk
+UPLOAD_WORKERS = 4
+
+METRICS_REPORT = "run_report.json"
+METRICS_PROMETHEUS = None  # путь к .prom файлу для node_exporter
+
+CACHE_MAX_SIZE = 1024
+CACHE_TTL = 300
+CACHE_VERSION_CHECK = 5  # секунд между проверками schedule_versions
 
-STYLE = Style.from_dict(
-    {
-        "dialog": "bg:#000000 fg:#8d9ea5",
-        "button": "bg:#8d9ea5",
-        "button.focused": "bg:#316d92",
-        "button.arrow": "fg:#316d92",
-        "te" "checkbox": "fg:#8d9ea5",
-        "checkbox-checked": "#316d92",
-        "checkbox-list": "#8d9ea5",
-        "radio": "fg:#8d9ea5",
-        "radio-checked": "#316d92",
-        "radio-list": "#8d9ea5",
-        "dialog.body": "bg:#031019",
-        "dialog shadow": "bg:#000000",
-        "frame.label": "fg:#316d92",
-        "dialog.body label": "fg:#316d92",
-    }
-)
+STYLE = {
+    "dialog": "bg:#000000 fg:#8d9ea5",
+    "button": "bg:#8d9ea5",
+    "button.focused": "bg:#316d92",
+    "button.arrow": "fg:#316d92",
+    "te" "checkbox": "fg:#8d9ea5",
+    "checkbox-checked": "#316d92",
+    "checkbox-list": "#8d9ea5",
+    "radio": "fg:#8d9ea5",
+    "radio-checked": "#316d92",
+    "radio-list": "#8d9ea5",
+    "dialog.body": "bg:#031019",
+    "dialog shadow": "bg:#000000",
+    "frame.label": "fg:#316d92",
+    "dialog.body label": "fg:#316d92",
+}
 
 try:
     from local_settings import *
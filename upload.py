@@ -1,110 +1,520 @@
+import os
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
 from tqdm import tqdm
 
-from settings import logging
-from database import connection
+from settings import logging, UPLOAD_BATCH_SIZE, UPLOAD_MODE, UPLOAD_WORKERS
+from database import get_connection
+from metrics import timed
+from queries import bump_schedule_version, invalidate_schedules
 from parse_xlsx import get_parsed_data, Group, Pair, ExamCredit
 
+INSERT_PAIRS = """
+INSERT INTO pairs(week_day, date, number, teacher, auditorium, name, subgroup_name, specialty)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+"""
 
-def insert_groups(groups: list[Group]):
-    try:
-        with connection.cursor() as cursor:
-            with tqdm(groups, desc="Вставка групп", ncols=150) as progress_bar:
-                for group in progress_bar:
-                    for subgroup in group.subgroups:
-                        cursor.execute(
-                            """
-                            INSERT IGNORE INTO subgroups(faculty_name, group_name, course, specialty, form, subgroup_name) 
-                            VALUES (%s, %s, %s, %s, %s, %s);
-                            """,
-                            (
-                                group.faculty,
-                                group.name,
-                                group.course,
-                                group.specialty,
-                                group.form,
-                                subgroup,
-                            ),
-                        )
-        connection.commit()
-    except Exception as e:
-        logging.error(f"Ошибка вставки групп: {e}")
-        connection.rollback()
+INSERT_EXAMS_CREDITS = """
+INSERT INTO exams_credits(week_day, date, teacher, auditorium, name, time, subgroup_name, specialty)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+"""
+
+PAIRS_COLUMNS = (
+    "week_day",
+    "date",
+    "number",
+    "teacher",
+    "auditorium",
+    "name",
+    "subgroup_name",
+    "specialty",
+)
+
+EXAMS_CREDITS_COLUMNS = (
+    "week_day",
+    "date",
+    "teacher",
+    "auditorium",
+    "name",
+    "time",
+    "subgroup_name",
+    "specialty",
+)
+
+
+@dataclass
+class SyncStats:
+    added: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+
+def _pair_row(pair: Pair) -> Tuple:
+    return (
+        pair.week_day,
+        pair.date,
+        pair.number,
+        pair.teacher,
+        pair.auditorium,
+        pair.name,
+        pair.subgroup,
+        pair.specialty,
+    )
+
+
+def _exam_credit_row(exam_credit: ExamCredit) -> Tuple:
+    return (
+        exam_credit.week_day,
+        exam_credit.date,
+        exam_credit.teacher,
+        exam_credit.auditorium,
+        exam_credit.name,
+        exam_credit.time,
+        exam_credit.subgroup,
+        exam_credit.specialty,
+    )
+
+
+def _touched_keys(records: Iterable[Pair | ExamCredit]) -> Set[Tuple]:
+    return {(record.date, record.subgroup, record.specialty) for record in records}
+
+
+def _batches(records: Sequence, size: int = UPLOAD_BATCH_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(records), size):
+        yield records[start : start + size]
+
+
+def _group_by_key(records: Iterable[Pair | ExamCredit]) -> Dict[Tuple, List]:
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[(record.date, record.subgroup, record.specialty)].append(record)
+    return grouped
+
+
+def _delete_keys(cursor, table: str, keys: Sequence[Tuple]) -> None:
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(keys))
+    cursor.execute(
+        f"DELETE FROM {table} WHERE (date, subgroup_name, specialty) IN ({placeholders});",
+        [value for key in keys for value in key],
+    )
+
+
+def _replace_records(
+    cursor,
+    table: str,
+    insert_sql: str,
+    to_row: Callable[[Pair | ExamCredit], Tuple],
+    records: Iterable[Pair | ExamCredit],
+    progress_bar: tqdm,
+) -> None:
+    grouped = _group_by_key(records)
+    for keys in _batches(list(grouped)):
+        _delete_keys(cursor, table, keys)
+        rows = [to_row(record) for key in keys for record in grouped[key]]
+        for batch in _batches(rows):
+            cursor.executemany(insert_sql, batch)
+        progress_bar.update(len(rows))
+    bump_schedule_version(cursor, table)
 
 
-def insert_pairs(pairs: list[Pair]):
+@timed("upload.insert_groups")
+def insert_groups(groups: list[Group], progress: bool = True) -> int | None:
+    rows = [
+        (
+            group.faculty,
+            group.name,
+            group.course,
+            group.specialty,
+            group.form,
+            subgroup,
+        )
+        for group in groups
+        for subgroup in group.subgroups
+    ]
     try:
-        with connection.cursor() as cursor:
-            temp_pair = Pair("", "1 января 1970 г.", 0, "", "", "", "")
-            with tqdm(pairs, desc="Вставка пар", ncols=150) as progress_bar:
-                for pair in progress_bar:
-                    if (
-                        temp_pair.date != pair.date
-                        or temp_pair.subgroup != pair.subgroup
-                    ):
-                        cursor.execute(
-                            "DELETE FROM pairs WHERE date = %s AND subgroup_name = %s;",
-                            (pair.date, pair.subgroup),
-                        )
-                        temp_pair = pair
-                    cursor.execute(
+        with get_connection() as connection, connection.cursor() as cursor:
+            with tqdm(
+                total=len(rows), desc="Вставка групп", ncols=150, disable=not progress
+            ) as progress_bar:
+                for batch in _batches(rows):
+                    cursor.executemany(
                         """
-                        INSERT INTO pairs(week_day, date, number, teacher, auditorium, name, subgroup_name, specialty)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+                        INSERT IGNORE INTO subgroups(faculty_name, group_name, course, specialty, form, subgroup_name) 
+                        VALUES (%s, %s, %s, %s, %s, %s);
                         """,
-                        (
-                            pair.week_day,
-                            pair.date,
-                            pair.number,
-                            pair.teacher,
-                            pair.auditorium,
-                            pair.name,
-                            pair.subgroup,
-                            pair.specialty,
-                        ),
+                        batch,
                     )
+                    progress_bar.update(len(batch))
             connection.commit()
+    except Exception as e:
+        logging.error(f"Ошибка вставки групп: {e}")
+        return None
+    return len(rows)
+
+
+@timed("upload.insert_pairs")
+def insert_pairs(pairs: list[Pair], progress: bool = True) -> int | None:
+    try:
+        with get_connection() as connection, connection.cursor() as cursor:
+            with tqdm(
+                total=len(pairs), desc="Вставка пар", ncols=150, disable=not progress
+            ) as progress_bar:
+                _replace_records(
+                    cursor, "pairs", INSERT_PAIRS, _pair_row, pairs, progress_bar
+                )
+            connection.commit()
+        invalidate_schedules("pairs", _touched_keys(pairs))
     except Exception as e:
         logging.error(f"Ошибка вставки пар: {e}")
-        connection.rollback()
+        return None
+    return len(pairs)
 
 
-def insert_exams_credits(exams_credits: list[ExamCredit]):
+@timed("upload.insert_exams_credits")
+def insert_exams_credits(
+    exams_credits: list[ExamCredit], progress: bool = True
+) -> int | None:
     try:
-        with connection.cursor() as cursor:
-            temp_pair = ExamCredit("", "01.01.1970", "", "", "", "", "")
+        with get_connection() as connection, connection.cursor() as cursor:
             with tqdm(
-                exams_credits, desc="Вставка экзаменов/зачетов", ncols=150
+                total=len(exams_credits),
+                desc="Вставка экзаменов/зачетов",
+                ncols=150,
+                disable=not progress,
             ) as progress_bar:
-                for exam_credit in progress_bar:
-                    if (
-                        temp_pair.date != exam_credit.date
-                        or temp_pair.subgroup != exam_credit.subgroup
-                    ):
-                        cursor.execute(
-                            "DELETE FROM exams_credits WHERE date = %s AND subgroup_name = %s;",
-                            (exam_credit.date, exam_credit.subgroup),
-                        )
-                        temp_pair = exam_credit
-                    cursor.execute(
-                        """
-                        INSERT INTO exams_credits(week_day, date, teacher, auditorium, name, time, subgroup_name, specialty)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-                        """,
-                        (
-                            exam_credit.week_day,
-                            exam_credit.date,
-                            exam_credit.teacher,
-                            exam_credit.auditorium,
-                            exam_credit.name,
-                            exam_credit.time,
-                            exam_credit.subgroup,
-                            exam_credit.specialty,
-                        ),
-                    )
+                _replace_records(
+                    cursor,
+                    "exams_credits",
+                    INSERT_EXAMS_CREDITS,
+                    _exam_credit_row,
+                    exams_credits,
+                    progress_bar,
+                )
             connection.commit()
+        invalidate_schedules("exams_credits", _touched_keys(exams_credits))
     except Exception as e:
         logging.error(f"Ошибка вставки экзаменов/зачетов: {e}")
-        connection.rollback()
+        return None
+    return len(exams_credits)
+
+
+def _normalize_row(row: Tuple) -> Tuple:
+    return tuple(
+        value if value is None or isinstance(value, date) else str(value)
+        for value in row
+    )
+
+
+def _load_existing_rows(
+    cursor, table: str, columns: Tuple[str, ...], keys: Set[Tuple]
+) -> Set[Tuple]:
+    existing_rows = set()
+    if not keys:
+        return existing_rows
+
+    dates = [key[0] for key in keys]
+    subgroups = sorted({(subgroup, specialty) for _, subgroup, specialty in keys})
+    for batch in _batches(subgroups):
+        placeholders = ", ".join(["(%s, %s)"] * len(batch))
+        cursor.execute(
+            f"""
+            SELECT {", ".join(columns)} FROM {table}
+            WHERE (subgroup_name, specialty) IN ({placeholders})
+            AND date BETWEEN %s AND %s;
+            """,
+            [value for subgroup in batch for value in subgroup]
+            + [min(dates), max(dates)],
+        )
+        for record in cursor.fetchall():
+            row = _normalize_row(tuple(record[column] for column in columns))
+            if (record["date"], record["subgroup_name"], record["specialty"]) in keys:
+                existing_rows.add(row)
+    return existing_rows
+
+
+def _delete_rows(cursor, table: str, columns: Tuple[str, ...], rows: List[Tuple]):
+    conditions = " AND ".join(f"{column} <=> %s" for column in columns)
+    for batch in _batches(rows):
+        cursor.executemany(f"DELETE FROM {table} WHERE {conditions};", batch)
+
+
+def _sync_records(
+    cursor,
+    table: str,
+    columns: Tuple[str, ...],
+    insert_sql: str,
+    to_row: Callable[[Pair | ExamCredit], Tuple],
+    records: Iterable[Pair | ExamCredit],
+) -> SyncStats:
+    keys = set()
+    new_rows = set()
+    for record in records:
+        keys.add((record.date, record.subgroup, record.specialty))
+        new_rows.add(_normalize_row(to_row(record)))
+
+    existing_rows = _load_existing_rows(cursor, table, columns, keys)
+    removed_rows = list(existing_rows - new_rows)
+    added_rows = list(new_rows - existing_rows)
+
+    _delete_rows(cursor, table, columns, removed_rows)
+    for batch in _batches(added_rows):
+        cursor.executemany(insert_sql, batch)
+    if removed_rows or added_rows:
+        bump_schedule_version(cursor, table)
+
+    return SyncStats(
+        added=len(added_rows),
+        removed=len(removed_rows),
+        unchanged=len(new_rows) - len(added_rows),
+    )
+
+
+@timed("upload.sync_pairs")
+def sync_pairs(pairs: list[Pair]) -> SyncStats | None:
+    try:
+        with get_connection() as connection, connection.cursor() as cursor:
+            stats = _sync_records(
+                cursor, "pairs", PAIRS_COLUMNS, INSERT_PAIRS, _pair_row, pairs
+            )
+            connection.commit()
+        invalidate_schedules("pairs", _touched_keys(pairs))
+    except Exception as e:
+        logging.error(f"Ошибка синхронизации пар: {e}")
+        return None
+    logging.info(
+        f"Пары: добавлено {stats.added}, удалено {stats.removed}, "
+        f"без изменений {stats.unchanged}"
+    )
+    return stats
+
+
+@timed("upload.sync_exams_credits")
+def sync_exams_credits(exams_credits: list[ExamCredit]) -> SyncStats | None:
+    try:
+        with get_connection() as connection, connection.cursor() as cursor:
+            stats = _sync_records(
+                cursor,
+                "exams_credits",
+                EXAMS_CREDITS_COLUMNS,
+                INSERT_EXAMS_CREDITS,
+                _exam_credit_row,
+                exams_credits,
+            )
+            connection.commit()
+        invalidate_schedules("exams_credits", _touched_keys(exams_credits))
+    except Exception as e:
+        logging.error(f"Ошибка синхронизации экзаменов/зачетов: {e}")
+        return None
+    logging.info(
+        f"Экзамены/зачеты: добавлено {stats.added}, удалено {stats.removed}, "
+        f"без изменений {stats.unchanged}"
+    )
+    return stats
+
+
+def _tsv_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _write_tsv(
+    to_row: Callable[[Pair | ExamCredit], Tuple],
+    records: Iterable[Pair | ExamCredit],
+) -> str:
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="", suffix=".tsv", delete=False
+    ) as file:
+        for record in records:
+            file.write("\t".join(_tsv_value(value) for value in to_row(record)))
+            file.write("\n")
+    return file.name
+
+
+def _bulk_load_records(
+    cursor,
+    table: str,
+    columns: Tuple[str, ...],
+    to_row: Callable[[Pair | ExamCredit], Tuple],
+    records: Iterable[Pair | ExamCredit],
+) -> None:
+    staging_table = f"{table}_staging"
+    column_list = ", ".join(columns)
+    file_name = _write_tsv(to_row, records)
+    try:
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging_table};")
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {staging_table} "
+            f"SELECT {column_list} FROM {table} LIMIT 0;"
+        )
+        cursor.execute(
+            f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE {staging_table}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n'
+            ({column_list});
+            """,
+            (file_name,),
+        )
+        cursor.execute(
+            f"""
+            DELETE {table} FROM {table}
+            JOIN (
+                SELECT DISTINCT date, subgroup_name, specialty FROM {staging_table}
+            ) AS staged USING (date, subgroup_name, specialty);
+            """
+        )
+        cursor.execute(
+            f"INSERT INTO {table} ({column_list}) "
+            f"SELECT {column_list} FROM {staging_table};"
+        )
+        cursor.execute(f"DROP TEMPORARY TABLE {staging_table};")
+        bump_schedule_version(cursor, table)
+    finally:
+        os.remove(file_name)
+
+
+@timed("upload.bulk_load_pairs")
+def bulk_load_pairs(pairs: list[Pair]) -> int | None:
+    try:
+        with get_connection(
+            local_infile=True
+        ) as connection, connection.cursor() as cursor:
+            _bulk_load_records(cursor, "pairs", PAIRS_COLUMNS, _pair_row, pairs)
+            connection.commit()
+        invalidate_schedules("pairs", _touched_keys(pairs))
+    except Exception as e:
+        logging.error(f"Ошибка загрузки пар: {e}")
+        return None
+    return len(pairs)
+
+
+@timed("upload.bulk_load_exams_credits")
+def bulk_load_exams_credits(exams_credits: list[ExamCredit]) -> int | None:
+    try:
+        with get_connection(
+            local_infile=True
+        ) as connection, connection.cursor() as cursor:
+            _bulk_load_records(
+                cursor,
+                "exams_credits",
+                EXAMS_CREDITS_COLUMNS,
+                _exam_credit_row,
+                exams_credits,
+            )
+            connection.commit()
+        invalidate_schedules("exams_credits", _touched_keys(exams_credits))
+    except Exception as e:
+        logging.error(f"Ошибка загрузки экзаменов/зачетов: {e}")
+        return None
+    return len(exams_credits)
+
+
+PAIRS_UPLOADERS = {
+    "replace": insert_pairs,
+    "sync": sync_pairs,
+    "bulk": bulk_load_pairs,
+}
+EXAMS_CREDITS_UPLOADERS = {
+    "replace": insert_exams_credits,
+    "sync": sync_exams_credits,
+    "bulk": bulk_load_exams_credits,
+}
+
+
+@dataclass
+class Partition:
+    groups: List[Group] = field(default_factory=list)
+    pairs: List[Pair] = field(default_factory=list)
+    exams_credits: List[ExamCredit] = field(default_factory=list)
+
+
+def _partition_by_faculty(
+    groups: List[Group], pairs: List[Pair], exams_credits: List[ExamCredit]
+) -> Dict[str, Partition]:
+    partitions: Dict[str, Partition] = defaultdict(Partition)
+    faculties = {}
+    for group in groups:
+        partitions[group.faculty].groups.append(group)
+        for subgroup in group.subgroups:
+            faculties[(subgroup, group.specialty)] = group.faculty
+    for pair in pairs:
+        faculty = faculties.get((pair.subgroup, pair.specialty), "")
+        partitions[faculty].pairs.append(pair)
+    for exam_credit in exams_credits:
+        faculty = faculties.get((exam_credit.subgroup, exam_credit.specialty), "")
+        partitions[faculty].exams_credits.append(exam_credit)
+    return partitions
+
+
+def upload_records(
+    groups: List[Group],
+    pairs: List[Pair],
+    exams_credits: List[ExamCredit],
+    mode: str = UPLOAD_MODE,
+    progress: bool = True,
+) -> bool:
+    results = []
+    if groups:
+        results.append(insert_groups(groups, progress=progress))
+    if mode == "replace":
+        if pairs:
+            results.append(insert_pairs(pairs, progress=progress))
+        if exams_credits:
+            results.append(insert_exams_credits(exams_credits, progress=progress))
+    else:
+        if pairs:
+            results.append(PAIRS_UPLOADERS[mode](pairs))
+        if exams_credits:
+            results.append(EXAMS_CREDITS_UPLOADERS[mode](exams_credits))
+    return all(result is not None for result in results)
+
+
+def _upload_partition(partition: Partition, mode: str) -> bool:
+    return upload_records(
+        partition.groups,
+        partition.pairs,
+        partition.exams_credits,
+        mode=mode,
+        progress=False,
+    )
+
+
+def upload_parallel(
+    groups: List[Group],
+    pairs: List[Pair],
+    exams_credits: List[ExamCredit],
+    workers: int = UPLOAD_WORKERS,
+    mode: str = UPLOAD_MODE,
+) -> bool:
+    uploaded = True
+    partitions = _partition_by_faculty(groups, pairs, exams_credits)
+    with ThreadPoolExecutor(max_workers=workers) as executor, tqdm(
+        total=len(partitions), desc="Загрузка факультетов", ncols=150
+    ) as progress_bar:
+        futures = {
+            executor.submit(_upload_partition, partition, mode): faculty
+            for faculty, partition in partitions.items()
+        }
+        for future in as_completed(futures):
+            try:
+                uploaded = future.result() and uploaded
+            except Exception as e:
+                logging.error(f"Ошибка загрузки факультета '{futures[future]}': {e}")
+                uploaded = False
+            progress_bar.update()
+    return uploaded
 
 
 if __name__ == "__main__":